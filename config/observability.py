@@ -1,7 +1,9 @@
 """
 Observability configuration for LangSmith and Monte Carlo debugging
 """
+import functools
 import os
+from dataclasses import dataclass, field
 from typing import Optional
 from langsmith import Client
 from langchain_core.tracers import LangChainTracer
@@ -12,53 +14,96 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_UNSET = object()
+
+@dataclass(frozen=True)
 class ObservabilityConfig:
-    def __init__(self):
-        self.langsmith_api_key = os.getenv("LANGSMITH_API_KEY")
-        self.langsmith_project = os.getenv("LANGSMITH_PROJECT", "doctor-appointment-agent")
-        self.langsmith_endpoint = os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
-        
-        # Initialize LangSmith client
-        self.client = None
-        if self.langsmith_api_key:
-            self.client = Client(
-                api_key=self.langsmith_api_key,
-                api_url=self.langsmith_endpoint
-            )
-            logger.info(f"LangSmith client initialized for project: {self.langsmith_project}")
-        else:
-            logger.warning("LANGSMITH_API_KEY not found. Observability features will be disabled.")
-    
+    """Immutable snapshot of the LangSmith environment configuration
+
+    The LangSmith client (and its tracer) are built lazily on first use so
+    importing this module stays cheap and network/version checks only
+    happen once tracing is actually needed.
+    """
+    langsmith_api_key: Optional[str]
+    langsmith_project: str
+    langsmith_endpoint: str
+
+    @property
+    def client(self) -> Optional[Client]:
+        """LangSmith client, constructed on first access"""
+        client = self.__dict__.get("_client", _UNSET)
+        if client is _UNSET:
+            client = None
+            if self.langsmith_api_key:
+                client = Client(
+                    api_key=self.langsmith_api_key,
+                    api_url=self.langsmith_endpoint
+                )
+                logger.info(f"LangSmith client initialized for project: {self.langsmith_project}")
+            object.__setattr__(self, "_client", client)
+        return client
+
+    @property
+    def tracer(self) -> Optional[LangChainTracer]:
+        """Shared LangChain tracer, constructed on first access"""
+        tracer = self.__dict__.get("_tracer", _UNSET)
+        if tracer is _UNSET:
+            tracer = None
+            if self.client:
+                tracer = LangChainTracer(
+                    project_name=self.langsmith_project,
+                    client=self.client
+                )
+            object.__setattr__(self, "_tracer", tracer)
+        return tracer
+
     def get_tracer(self) -> Optional[LangChainTracer]:
-        """Get LangChain tracer for observability"""
-        if self.client:
-            return LangChainTracer(
-                project_name=self.langsmith_project,
-                client=self.client
-            )
-        return None
-    
+        """Get the shared LangChain tracer for observability"""
+        return self.tracer
+
     def get_callbacks(self) -> list:
-        """Get callbacks for tracing"""
-        callbacks = []
-        tracer = self.get_tracer()
-        if tracer:
-            callbacks.append(tracer)
-        return callbacks
+        """Get callbacks for tracing (fresh list, shared tracer)"""
+        return [self.tracer] if self.tracer else []
+
+
+@functools.lru_cache(maxsize=1)
+def get_observability_config() -> ObservabilityConfig:
+    """Build the config once: env vars are read a single time per process"""
+    langsmith_api_key = os.environ.get("LANGSMITH_API_KEY")
+    langsmith_project = os.environ.get("LANGSMITH_PROJECT", "doctor-appointment-agent")
+    langsmith_endpoint = os.environ.get("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
+
+    if not langsmith_api_key:
+        logger.warning("LANGSMITH_API_KEY not found. Observability features will be disabled.")
+
+    return ObservabilityConfig(
+        langsmith_api_key=langsmith_api_key,
+        langsmith_project=langsmith_project,
+        langsmith_endpoint=langsmith_endpoint
+    )
 
 # Global observability config
-observability_config = ObservabilityConfig()
+observability_config = get_observability_config()
+
+# Guard so setup only mutates os.environ once per process
+_SETUP_DONE = False
 
 
 def setup_observability():
     """Setup observability for the application"""
-    # Set environment variables for LangSmith
+    global _SETUP_DONE
+    if _SETUP_DONE:
+        return
+
+    # Set environment variables for LangSmith; setdefault leaves values the
+    # operator already exported untouched and skips redundant writes
     if observability_config.langsmith_api_key:
-        os.environ["LANGCHAIN_TRACING_V2"] = "true"
-        os.environ["LANGCHAIN_ENDPOINT"] = observability_config.langsmith_endpoint
-        os.environ["LANGCHAIN_API_KEY"] = observability_config.langsmith_api_key
-        os.environ["LANGCHAIN_PROJECT"] = observability_config.langsmith_project
+        os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
+        os.environ.setdefault("LANGCHAIN_ENDPOINT", observability_config.langsmith_endpoint)
+        os.environ.setdefault("LANGCHAIN_API_KEY", observability_config.langsmith_api_key)
+        os.environ.setdefault("LANGCHAIN_PROJECT", observability_config.langsmith_project)
         logger.info("Observability setup complete")
+        _SETUP_DONE = True
     else:
         logger.warning("LangSmith not configured. Set LANGSMITH_API_KEY to enable observability")
 
@@ -3,6 +3,8 @@ Monte Carlo debugging configuration for LangSmith
 """
 import os
 import asyncio
+import math
+from collections import Counter
 from typing import Dict, List, Any, Optional
 from langsmith import Client
 from langsmith.evaluation import evaluate
@@ -11,21 +13,45 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Evaluator keyword sets, pre-lowercased so evaluations never re-lower them
+_EXPECTED_KEYWORDS = ("dentist", "doctor", "appointment", "availability")
+_CLARIFICATION_PHRASES = ("please specify", "need more information")
+_HELPFUL_WORDS = ("help", "assist", "available", "schedule")
+
 class MonteCarloDebugger:
     """Monte Carlo debugging for the doctor appointment system"""
     
     def __init__(self, langsmith_client: Optional[Client] = None):
         self.client = langsmith_client
+        # Full run payloads are only retained in verbose mode — response
+        # objects can be hundreds of KB each
         self.debug_runs = []
         self.evaluation_results = []
+        # Compact per-run records: response times and (error_type, message)
+        self._success_times: List[float] = []
+        self._failures: List[tuple] = []
+        # Running aggregates so generate_debug_report is O(1) instead of
+        # re-scanning debug_runs on every report
+        self._success_count = 0
+        self._error_counts = Counter()
+        self._rt_sum = 0.0
+        self._rt_min = math.inf
+        self._rt_max = -math.inf
     
-    async def run_monte_carlo_simulation(self, 
-                                       agent_func, 
-                                       test_cases: List[Dict[str, Any]], 
-                                       num_simulations: int = 10) -> Dict[str, Any]:
-        """Run Monte Carlo simulation on the agent"""
-        logger.info(f"Starting Monte Carlo simulation with {num_simulations} runs")
-        
+    async def run_monte_carlo_simulation(self,
+                                       agent_func,
+                                       test_cases: List[Dict[str, Any]],
+                                       num_simulations: int = 10,
+                                       max_concurrency: int = 10,
+                                       verbose: bool = False) -> Dict[str, Any]:
+        """Run Monte Carlo simulation on the agent
+
+        Runs are independent I/O-bound agent calls, so they are executed
+        concurrently with asyncio.gather, throttled by a semaphore of
+        `max_concurrency` to stay within LLM provider rate limits.
+        """
+        logger.info("Starting Monte Carlo simulation with %s runs", num_simulations)
+
         results = {
             'success_rate': 0,
             'error_rate': 0,
@@ -33,92 +59,131 @@ class MonteCarloDebugger:
             'common_failures': [],
             'performance_metrics': {}
         }
-        
+
+        # Hoist hot-loop lookups: resolving the loop clock and the coroutine
+        # check once instead of per run
+        loop_time = asyncio.get_running_loop().time
+        is_coroutine = asyncio.iscoroutinefunction(agent_func)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_one(simulation, test_case):
+            async with semaphore:
+                start_time = loop_time()
+
+                # Run the agent with the test case
+                if is_coroutine:
+                    response = await agent_func(test_case)
+                else:
+                    response = await asyncio.to_thread(agent_func, test_case)
+
+                return {
+                    'simulation': simulation,
+                    'test_case': test_case,
+                    'response': response,
+                    'response_time': loop_time() - start_time,
+                    'success': True
+                }
+
+        tasks = [
+            run_one(simulation, test_case)
+            for simulation in range(num_simulations)
+            for test_case in test_cases
+        ]
+        run_results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Aggregate after gather so no shared state is mutated concurrently
         successful_runs = 0
         total_response_time = 0
-        error_counts = {}
-        
-        for simulation in range(num_simulations):
-            for test_case in test_cases:
-                try:
-                    start_time = asyncio.get_event_loop().time()
-                    
-                    # Run the agent with the test case
-                    if asyncio.iscoroutinefunction(agent_func):
-                        response = await agent_func(test_case)
-                    else:
-                        response = agent_func(test_case)
-                    
-                    end_time = asyncio.get_event_loop().time()
-                    response_time = end_time - start_time
-                    total_response_time += response_time
-                    
-                    successful_runs += 1
-                    
-                    # Log the run for debugging
-                    self.debug_runs.append({
-                        'simulation': simulation,
-                        'test_case': test_case,
-                        'response': response,
-                        'response_time': response_time,
-                        'success': True
-                    })
-                    
-                except Exception as e:
-                    error_type = type(e).__name__
-                    error_counts[error_type] = error_counts.get(error_type, 0) + 1
-                    
-                    logger.error(f"Simulation {simulation} failed: {e}")
-                    
+        error_counts = Counter()
+
+        for index, run_result in enumerate(run_results):
+            if isinstance(run_result, BaseException):
+                error_type = type(run_result).__name__
+                error_counts[error_type] += 1
+
+                simulation, test_case = divmod(index, len(test_cases))
+                logger.error("Simulation %s failed: %s", simulation, run_result)
+
+                self._failures.append((error_type, str(run_result)[:200]))
+                if verbose:
                     self.debug_runs.append({
                         'simulation': simulation,
-                        'test_case': test_case,
-                        'error': str(e),
+                        'test_case': test_cases[test_case],
+                        'error': str(run_result),
                         'error_type': error_type,
                         'success': False
                     })
-        
+            else:
+                successful_runs += 1
+                response_time = run_result['response_time']
+                total_response_time += response_time
+                self._success_times.append(response_time)
+                if verbose:
+                    self.debug_runs.append(run_result)
+                # Keep streaming min/max for the debug report
+                if response_time < self._rt_min:
+                    self._rt_min = response_time
+                if response_time > self._rt_max:
+                    self._rt_max = response_time
+
+        # Fold this simulation batch into the running aggregates
+        self._success_count += successful_runs
+        self._error_counts.update(error_counts)
+        self._rt_sum += total_response_time
+
         # Calculate metrics
         total_runs = num_simulations * len(test_cases)
         results['success_rate'] = successful_runs / total_runs
         results['error_rate'] = 1 - results['success_rate']
         results['avg_response_time'] = total_response_time / successful_runs if successful_runs > 0 else 0
-        results['common_failures'] = sorted(error_counts.items(), key=lambda x: x[1], reverse=True)
-        
-        logger.info(f"Monte Carlo simulation completed. Success rate: {results['success_rate']:.2%}")
+        results['common_failures'] = error_counts.most_common()
+
+        logger.info("Monte Carlo simulation completed. Success rate: %.2f%%", results['success_rate'] * 100)
         return results
     
-    async def evaluate_agent_performance(self, 
-                                       agent_func, 
-                                       test_cases: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Evaluate agent performance using LangSmith evaluation"""
+    async def evaluate_agent_performance(self,
+                                       agent_func,
+                                       test_cases: List[Dict[str, Any]],
+                                       max_concurrency: int = 10) -> Dict[str, Any]:
+        """Evaluate agent performance using LangSmith evaluation
+
+        Each evaluation is an independent LangSmith round-trip, so they run
+        concurrently under a semaphore instead of strictly serially.
+        """
         if not self.client:
             logger.warning("LangSmith client not available for evaluation")
             return {}
-        
-        evaluation_results = []
-        
-        for test_case in test_cases:
-            try:
-                # Create evaluation example
-                example = Example(
-                    inputs=test_case,
-                    outputs={"expected": test_case.get("expected_output", "")}
-                )
-                
-                # Run evaluation
-                result = await evaluate(
+
+        # Build the evaluator once instead of per test case
+        evaluator = self._create_custom_evaluator()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_one(example):
+            async with semaphore:
+                return await evaluate(
                     agent_func,
                     data=[example],
-                    evaluators=[self._create_custom_evaluator()],
+                    evaluators=[evaluator],
                     client=self.client
                 )
-                
+
+        examples = [
+            Example(
+                inputs=test_case,
+                outputs={"expected": test_case.get("expected_output", "")}
+            )
+            for test_case in test_cases
+        ]
+        results = await asyncio.gather(*(run_one(example) for example in examples),
+                                       return_exceptions=True)
+
+        evaluation_results = []
+        for test_case, result in zip(test_cases, results):
+            if isinstance(result, BaseException):
+                logger.error("Evaluation failed for test case %s: %s", test_case, result)
+            else:
                 evaluation_results.append(result)
-                
-            except Exception as e:
-                logger.error(f"Evaluation failed for test case {test_case}: {e}")
-        
+
         return {
             'evaluation_results': evaluation_results,
             'total_evaluations': len(evaluation_results),
@@ -131,28 +196,34 @@ class MonteCarloDebugger:
             """Custom evaluation logic"""
             score = 0
             feedback = []
-            
+
+            # Join only the message contents — repr() of full Message
+            # objects drags in metadata/IDs and inflates every scan below
+            messages = run.outputs.get('messages') or []
+            response_text = " ".join(
+                getattr(msg, "content", "") or (msg.get("content", "") if isinstance(msg, dict) else "")
+                for msg in messages
+            )
+            response_lower = response_text.lower()
+
             # Check if response contains expected keywords
-            expected_keywords = ['dentist', 'doctor', 'appointment', 'availability']
-            response_text = str(run.outputs.get('messages', []))
-            
-            for keyword in expected_keywords:
-                if keyword.lower() in response_text.lower():
+            for keyword in _EXPECTED_KEYWORDS:
+                if keyword in response_lower:
                     score += 0.25
                     feedback.append(f"Contains '{keyword}'")
-            
+
             # Check response length (not too short, not too long)
             if 50 <= len(response_text) <= 1000:
                 score += 0.25
                 feedback.append("Appropriate response length")
-            
+
             # Check if response asks for more information when needed
-            if 'please specify' in response_text.lower() or 'need more information' in response_text.lower():
+            if any(phrase in response_lower for phrase in _CLARIFICATION_PHRASES):
                 score += 0.25
                 feedback.append("Asks for clarification appropriately")
-            
+
             # Check if response is helpful
-            if any(word in response_text.lower() for word in ['help', 'assist', 'available', 'schedule']):
+            if any(word in response_lower for word in _HELPFUL_WORDS):
                 score += 0.25
                 feedback.append("Provides helpful information")
             
@@ -172,34 +243,27 @@ class MonteCarloDebugger:
         report.append("MONTE CARLO DEBUG REPORT")
         report.append("=" * 50)
         
-        # Summary statistics
-        total_runs = len(self.debug_runs)
-        successful_runs = len([r for r in self.debug_runs if r.get('success', False)])
-        
+        # Summary statistics from the running aggregates (no per-report scan)
+        total_runs = len(self._success_times) + len(self._failures)
+        successful_runs = self._success_count
+
         report.append(f"Total Runs: {total_runs}")
         report.append(f"Successful Runs: {successful_runs}")
         report.append(f"Success Rate: {successful_runs/total_runs:.2%}" if total_runs > 0 else "Success Rate: N/A")
-        
+
         # Error analysis
-        error_types = {}
-        for run in self.debug_runs:
-            if not run.get('success', False):
-                error_type = run.get('error_type', 'Unknown')
-                error_types[error_type] = error_types.get(error_type, 0) + 1
-        
-        if error_types:
+        if self._error_counts:
             report.append("\nError Analysis:")
-            for error_type, count in sorted(error_types.items(), key=lambda x: x[1], reverse=True):
+            for error_type, count in self._error_counts.most_common():
                 report.append(f"  {error_type}: {count} occurrences")
-        
+
         # Performance analysis
-        response_times = [r.get('response_time', 0) for r in self.debug_runs if r.get('success', False)]
-        if response_times:
-            avg_time = sum(response_times) / len(response_times)
+        if successful_runs > 0:
+            avg_time = self._rt_sum / successful_runs
             report.append(f"\nPerformance Analysis:")
             report.append(f"  Average Response Time: {avg_time:.2f} seconds")
-            report.append(f"  Min Response Time: {min(response_times):.2f} seconds")
-            report.append(f"  Max Response Time: {max(response_times):.2f} seconds")
+            report.append(f"  Min Response Time: {self._rt_min:.2f} seconds")
+            report.append(f"  Max Response Time: {self._rt_max:.2f} seconds")
         
         report.append("=" * 50)
         return "\n".join(report)
@@ -1,12 +1,15 @@
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import json
 from mcp_agent import MCPDoctorAppointmentAgent
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from config.observability import setup_observability
 from debugging.monte_carlo import setup_monte_carlo_debugging, run_debug_simulation, get_debug_report
 from dotenv import load_dotenv
 import os
 import logging
+from collections import OrderedDict
 from typing import Dict, List, Optional
 import uuid
 
@@ -25,8 +28,53 @@ setup_observability()
 
 app = FastAPI()
 
-# In-memory conversation storage (in production, use Redis or database)
-conversation_sessions: Dict[str, List] = {}
+# In-memory conversation storage (in production, use Redis or database).
+# Bounded LRU: least-recently-used sessions are evicted past MAX_SESSIONS,
+# and each session keeps at most MAX_SESSION_MESSAGES messages, so memory
+# cannot grow without limit.
+MAX_SESSIONS = 10_000
+MAX_SESSION_MESSAGES = 50
+conversation_sessions: "OrderedDict[str, Dict]" = OrderedDict()
+
+# Message class -> API type string, so serialization avoids per-message
+# __class__.__name__ string munging
+_MSG_TYPE = {
+    HumanMessage: "human",
+    AIMessage: "ai",
+    SystemMessage: "system",
+    ToolMessage: "tool",
+}
+
+# Prefix marking internal context messages that are hidden from clients
+_CTX_PREFIX = "User ID:"
+
+def _content(msg) -> str:
+    """Content of a LangChain message object or message dict."""
+    return msg.content if hasattr(msg, 'content') else msg.get("content", "")
+
+def _serialize_message(msg) -> dict:
+    """LangChain message (or already-dict message) as a JSON-safe dict."""
+    if not hasattr(msg, 'content'):
+        return msg
+    return {
+        "content": msg.content,
+        "type": _MSG_TYPE.get(type(msg), "ai"),
+        "name": getattr(msg, 'name', None),
+        "id": getattr(msg, 'id', None)
+    }
+
+def _store_session(session_id: str, full_conversation: List, id_number: int) -> None:
+    """Persist a session's history (capped per session, LRU-evicted overall)."""
+    conversation_sessions[session_id] = {
+        "messages": full_conversation[-MAX_SESSION_MESSAGES:],
+        "agent_state": {
+            "id_number": id_number,
+            "session_id": session_id
+        }
+    }
+    conversation_sessions.move_to_end(session_id)
+    while len(conversation_sessions) > MAX_SESSIONS:
+        conversation_sessions.popitem(last=False)
 
 # Define Pydantic model to accept request body
 class UserQuery(BaseModel):
@@ -36,23 +84,35 @@ class UserQuery(BaseModel):
 
 class SessionResponse(BaseModel):
     session_id: str
-    messages: List[dict]
+    # Only the messages produced this turn; the canonical history lives
+    # server-side in conversation_sessions, so replies stay O(turn) instead
+    # of re-shipping the whole conversation every time
+    new_messages: List[dict]
 
 # Use MCP Agent for better tool separation
 agent = MCPDoctorAppointmentAgent()
 
 @app.post("/execute")
-def execute_agent(user_input: UserQuery):
+async def execute_agent(user_input: UserQuery):
     try:
         # Generate or use existing session ID
-        session_id = user_input.session_id or str(uuid.uuid4())
+        session_id = user_input.session_id or uuid.uuid4().hex
         
-        # Get conversation history for this session
-        session_data = conversation_sessions.get(session_id, {})
-        conversation_history = session_data.get("messages", []) if isinstance(session_data, dict) else session_data
+        # Get conversation history for this session (marking it recently
+        # used). Sessions are always stored as {"messages", "agent_state"}.
+        session_data = conversation_sessions.get(session_id)
+        if session_data is not None:
+            conversation_sessions.move_to_end(session_id)
+            conversation_history = session_data["messages"]
+        else:
+            conversation_history = []
         
-        # Create input messages with conversation history
-        input_messages = [msg for msg in conversation_history if hasattr(msg, 'content') and not msg.content.startswith('User ID:')]
+        # Create input messages with conversation history; getattr with a
+        # default fetches content once instead of hasattr + attribute access
+        input_messages = [
+            msg for msg in conversation_history
+            if (c := getattr(msg, "content", None)) is not None and not c.startswith(_CTX_PREFIX)
+        ]
         
         # Create context message for MCP agent
         context_message = f"User ID: {user_input.id_number}\nQuery: {user_input.messages}"
@@ -66,13 +126,13 @@ def execute_agent(user_input: UserQuery):
             "session_id": session_id
         }
         
-        response = app_graph.invoke(agent_input, config={"recursion_limit": 20})
+        response = await app_graph.ainvoke(agent_input, config={"recursion_limit": 20})
         
     except Exception as e:
-        logger.error(f"Unexpected error in execute_agent: {e}")
+        logger.error("Unexpected error in execute_agent: %s", e)
         return SessionResponse(
-            session_id=session_id if 'session_id' in locals() else str(uuid.uuid4()),
-            messages=[{
+            session_id=session_id if 'session_id' in locals() else uuid.uuid4().hex,
+            new_messages=[{
                 "content": f"I encountered an error processing your request: {str(e)}. Please try again.",
                 "type": "ai", 
                 "name": "assistant",
@@ -96,48 +156,90 @@ def execute_agent(user_input: UserQuery):
         user_message = HumanMessage(content=user_input.messages)
         full_conversation = input_messages + [user_message] + [ai_message]
         
-        # Filter out context messages from the response for display
-        filtered_messages = []
-        for msg in response.get("messages", []):
-            if hasattr(msg, 'content'):
-                if not msg.content.startswith('User ID:'):
-                    filtered_messages.append(msg)
-            else:
-                if not msg.get("content", "").startswith('User ID:'):
-                    filtered_messages.append(msg)
-        
-        response["messages"] = filtered_messages
-        
     except (KeyError, IndexError, TypeError, AttributeError):
         full_conversation = response["messages"]
     
-    # Store conversation history
-    conversation_sessions[session_id] = {
-        "messages": full_conversation,
-        "agent_state": {
-            "id_number": response.get("id_number", user_input.id_number),
-            "session_id": session_id
-        }
-    }
-    
-    # Convert LangChain messages to dictionaries for JSON serialization
-    messages_dict = []
-    for msg in response.get("messages", []):
-        if hasattr(msg, 'content'):
-            messages_dict.append({
-                "content": msg.content,
-                "type": msg.__class__.__name__.lower().replace("message", ""),
-                "name": getattr(msg, 'name', None),
-                "id": getattr(msg, 'id', None)
-            })
-        else:
-            messages_dict.append(msg)
-    
+    # Store conversation history (capped per session, LRU-evicted overall)
+    _store_session(session_id, full_conversation, response.get("id_number", user_input.id_number))
+
+    # Only this turn's delta goes back over the wire: the user's plain
+    # query plus whatever the agent produced beyond the input prefix
+    new_messages = [_serialize_message(HumanMessage(content=user_input.messages))]
+    new_messages += [
+        _serialize_message(msg)
+        for msg in response.get("messages", [])[len(input_messages) + 1:]
+        if not _content(msg).startswith(_CTX_PREFIX)
+    ]
+
     return SessionResponse(
         session_id=session_id,
-        messages=messages_dict
+        new_messages=new_messages
     )
 
+@app.post("/execute/stream")
+async def execute_agent_stream(user_input: UserQuery):
+    """Execute the agent and stream the reply as newline-delimited JSON.
+
+    Each line is {"session_id": ..., "message": {...}} and is flushed as
+    soon as it is serialized, so clients can render messages as they
+    arrive instead of buffering the whole conversation first.
+    """
+    session_id = user_input.session_id or uuid.uuid4().hex
+
+    session_data = conversation_sessions.get(session_id)
+    if session_data is not None:
+        conversation_sessions.move_to_end(session_id)
+        conversation_history = session_data["messages"]
+    else:
+        conversation_history = []
+
+    input_messages = [
+        msg for msg in conversation_history
+        if (c := getattr(msg, "content", None)) is not None and not c.startswith(_CTX_PREFIX)
+    ]
+    final_message = HumanMessage(content=f"User ID: {user_input.id_number}\nQuery: {user_input.messages}")
+    agent_input = {
+        "messages": input_messages + [final_message],
+        "id_number": user_input.id_number,
+        "session_id": session_id
+    }
+
+    async def message_stream():
+        try:
+            response = await agent.workflow().ainvoke(agent_input, config={"recursion_limit": 20})
+        except Exception as e:
+            logger.error("Unexpected error in execute_agent_stream: %s", e)
+            yield json.dumps({
+                "session_id": session_id,
+                "message": {
+                    "content": f"I encountered an error processing your request: {str(e)}. Please try again.",
+                    "type": "ai",
+                    "name": "assistant",
+                    "id": None
+                }
+            }) + "\n"
+            return
+
+        messages = response.get("messages", [])
+        ai_message = AIMessage(content=_content(messages[-1]) if messages else "")
+        user_message = HumanMessage(content=user_input.messages)
+        _store_session(session_id, input_messages + [user_message, ai_message],
+                       response.get("id_number", user_input.id_number))
+
+        yield json.dumps({
+            "session_id": session_id,
+            "message": _serialize_message(user_message)
+        }) + "\n"
+        for msg in messages[len(input_messages) + 1:]:
+            if _content(msg).startswith(_CTX_PREFIX):
+                continue
+            yield json.dumps({
+                "session_id": session_id,
+                "message": _serialize_message(msg)
+            }) + "\n"
+
+    return StreamingResponse(message_stream(), media_type="application/x-ndjson")
+
 @app.post("/debug/simulation")
 async def run_debug_simulation_endpoint():
     """Run Monte Carlo debug simulation"""
@@ -170,7 +272,7 @@ async def run_debug_simulation_endpoint():
             "debug_report": get_debug_report()
         }
     except Exception as e:
-        logger.error(f"Debug simulation failed: {e}")
+        logger.error("Debug simulation failed: %s", e)
         return {"status": "error", "message": str(e)}
 
 @app.get("/debug/report")
@@ -180,7 +282,7 @@ def get_debug_report_endpoint():
         report = get_debug_report()
         return {"status": "success", "report": report}
     except Exception as e:
-        logger.error(f"Failed to get debug report: {e}")
+        logger.error("Failed to get debug report: %s", e)
         return {"status": "error", "message": str(e)}
 
 @app.get("/health")
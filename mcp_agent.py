@@ -9,7 +9,7 @@ from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict, Annotated
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
-from utils.llms import LLMModel
+from utils.llms import get_llm
 from dotenv import load_dotenv
 import logging
 from mcp_tools import mcp_agent
@@ -19,6 +19,21 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Actions whose result message is relayed verbatim to the user
+_KNOWN_ACTIONS = frozenset({
+    "cancellation_confirmation",
+    "cancellation_completed",
+    "cancellation_cancelled",
+    "booking_confirmation",
+    "booking_completed",
+    "booking_cancelled",
+    "show_appointments",
+    "show_availability",
+    "error",
+    "general",
+})
+_FALLBACK = "I'm here to help you with appointment booking and cancellation. What would you like to do?"
+
 class MCPAgentState(TypedDict):
     messages: Annotated[list[Any], add_messages]
     id_number: int
@@ -26,54 +41,40 @@ class MCPAgentState(TypedDict):
 
 class MCPDoctorAppointmentAgent:
     def __init__(self):
-        llm_model = LLMModel()
+        llm_model = get_llm()
         self.llm_model = llm_model.get_model_with_retry()
         self.llm_instance = llm_model
         self.mcp_agent = mcp_agent
+
+        # Build and compile the static graph once; workflow() just returns it
+        workflow = StateGraph(MCPAgentState)
+        workflow.add_node("chat", self.main_chat_node)
+        workflow.set_entry_point("chat")
+        workflow.add_edge("chat", END)
+        self.app = workflow.compile()
     
     def main_chat_node(self, state: MCPAgentState) -> Command[Literal['__end__']]:
         """Main chat node using MCP tools"""
-        user_query = ""
-        if state["messages"]:
-            for msg in reversed(state["messages"]):
-                if hasattr(msg, '__class__') and 'HumanMessage' in str(type(msg)):
-                    user_query = msg.content
-                    break
+        user_query = next(
+            (msg.content for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)),
+            ""
+        )
         
         user_id = state.get('id_number', 1234567)
         session_id = state.get('session_id', 'default_session')
         
         # Extract just the query part if it's wrapped in context format
-        if "Query: " in user_query:
-            user_query = user_query.split("Query: ")[1].strip()
+        # (partition scans once, unlike `in` + split)
+        _, sep, tail = user_query.partition("Query: ")
+        if sep:
+            user_query = tail.strip()
         
         # Process request using MCP agent
         try:
             result = self.mcp_agent.process_request(session_id, user_id, user_query)
             
             # Format response based on action type
-            if result["action"] == "cancellation_confirmation":
-                response = result["message"]
-            elif result["action"] == "cancellation_completed":
-                response = result["message"]
-            elif result["action"] == "cancellation_cancelled":
-                response = result["message"]
-            elif result["action"] == "booking_confirmation":
-                response = result["message"]
-            elif result["action"] == "booking_completed":
-                response = result["message"]
-            elif result["action"] == "booking_cancelled":
-                response = result["message"]
-            elif result["action"] == "show_appointments":
-                response = result["message"]
-            elif result["action"] == "show_availability":
-                response = result["message"]
-            elif result["action"] == "error":
-                response = result["message"]
-            elif result["action"] == "general":
-                response = result["message"]
-            else:
-                response = "I'm here to help you with appointment booking and cancellation. What would you like to do?"
+            response = result["message"] if result.get("action") in _KNOWN_ACTIONS else _FALLBACK
             
             return Command(
                 update={
@@ -94,18 +95,5 @@ class MCPDoctorAppointmentAgent:
             )
     
     def workflow(self):
-        """Create MCP-based workflow"""
-        workflow = StateGraph(MCPAgentState)
-        
-        # Add nodes
-        workflow.add_node("chat", self.main_chat_node)
-        
-        # Set entry point
-        workflow.set_entry_point("chat")
-        
-        # Add edges
-        workflow.add_edge("chat", END)
-        
-        # Compile the workflow
-        self.app = workflow.compile()
+        """Return the pre-compiled MCP-based workflow"""
         return self.app
@@ -3,58 +3,231 @@ MCP (Model Context Protocol) Tools for Doctor Appointment System
 Separate tools for booking and cancellation to avoid confusion
 """
 
+import functools
+import re
+import time
+from datetime import datetime
+from threading import RLock
+from collections import OrderedDict
 from typing import Dict, Any, List
 from dataclasses import dataclass
 from enum import Enum
 import pandas as pd
+from pydantic import ValidationError
 from data_models.models import *
 from toolkit.toolkits import *
 
+
+# Request-parsing patterns, compiled once instead of per process_request call
+_APPT_RE = re.compile(r'appointment #?([a-z]|\d+)')
+_DOCTOR_COLON_RE = re.compile(r'doctor:\s*([a-zA-Z\s]+)(?:\s*\([^)]+\))?')
+_DR_RE = re.compile(r'dr\.?\s*([a-zA-Z\s]+?)(?:\s+\([^)]+\))?')
+_DOCTOR_RE = re.compile(r'doctor\s+([a-zA-Z\s]+?)(?:\s+\([^)]+\))?')
+_DR_BEFORE_DATE_RE = re.compile(r'dr\.?\s*([a-zA-Z\s]+?)(?:\s+on|\s+\d{2}-\d{2}-\d{4})')
+_DOCTOR_BEFORE_DATE_RE = re.compile(r'doctor\s+([a-zA-Z\s]+?)(?:\s+on|\s+\d{2}-\d{2}-\d{4})')
+_DATE_RE = re.compile(r'(\d{2}-\d{2}-\d{4})')
+_SLOT_RE = re.compile(r'slot\s*(\d+)')
+_DATE_IN_LINE_RE = re.compile(r'(\w+day, \w+ \d+, \d+) at (\d+:\d+ [AP]M)')
+_APPT_LINE_RE = re.compile(r'^\s*[a-z]\.\s*🟢\s*Dr\.\s*(.+?)\s*$', re.IGNORECASE)
+
+# Intent keyword sets: the message is tokenized once per request and each
+# branch tests set intersection instead of rescanning the whole string
+_TOKEN_RE = re.compile(r"[a-z.]+")
+_INTENT_YES = frozenset({"yes", "confirm", "proceed"})
+_INTENT_NO = frozenset({"no", "cancel", "abort"})
+_BOOK_VERBS = frozenset({"book", "schedule", "appointment"})
+_BOOK_OBJS = frozenset({"slot", "dr.", "doctor"})
+_AVAIL_WORDS = frozenset({"check", "availability", "available"})
+_DOCTOR_WORDS = frozenset({"dr.", "doctor"})
+_VIEW_PHRASES = ("my appointments", "show appointments", "view appointments")
+
+# Appointment-letter tables: a dict get validates and converts in one step
+# (rejecting non-ASCII or multi-char input), replacing per-call ord() math
+_IDX_TO_LETTER = "abcdefghijklmnopqrstuvwxyz"
+_LETTER_TO_IDX = {c: i for i, c in enumerate(_IDX_TO_LETTER)}
+
+# Fixed-shape confirmation messages as module templates: format_map fills
+# the handful of fields without reparsing a multiline f-string per call
+_BOOK_CONFIRM_TMPL = """**🛡️ Booking Confirmation Required**
+
+**Appointment Details:**
+• Doctor: {doctor}
+• Date: {date}
+• Time: {time}
+• Patient ID: {uid}
+
+**Do you want to book this appointment?**
+
+**Please respond:**
+• **'yes'** to confirm booking
+• **'no'** to cancel booking"""
+
+_CANCEL_CONFIRM_TMPL = """**🛡️ Cancellation Confirmation Required**
+
+**Appointment Details:**
+• Doctor: {doctor}
+• Date: {date}
+• Patient ID: {uid}
+
+**Do you want to cancel this appointment?**
+
+**Please respond:**
+• **'yes'** to confirm cancellation
+• **'no'** to keep the appointment"""
+
+
+# Pydantic validation walks the schema on every construction; the same user
+# id and date strings recur constantly, so memoize the validated models
+@functools.lru_cache(maxsize=4096)
+def _id_model(uid: int) -> IdentificationNumberModel:
+    return IdentificationNumberModel(id=uid)
+
+@functools.lru_cache(maxsize=8192)
+def _dt_model(date_str: str) -> DateTimeModel:
+    return DateTimeModel(date=date_str)
+
+@functools.lru_cache(maxsize=8192)
+def _date_model(date_str: str) -> DateModel:
+    return DateModel(date=date_str)
+
+
+# Availability answers are cached for a short window: the common flow is
+# "check availability" immediately followed by "book slot N" for the same
+# doctor and date, which would otherwise run the tool twice
+_AVAILABILITY_TTL_SECONDS = 30
+
+@functools.lru_cache(maxsize=512)
+def _availability_cached(doctor_name: str, date_str: str, bucket: int) -> str:
+    return check_availability_by_doctor.invoke({
+        "desired_date": _date_model(date_str),
+        "doctor_name": doctor_name
+    })
+
+def _check_availability(doctor_name: str, date_str: str) -> str:
+    """TTL-cached wrapper around the availability tool"""
+    bucket = int(time.time() // _AVAILABILITY_TTL_SECONDS)
+    return _availability_cached(doctor_name, date_str, bucket)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_availability() -> pd.DataFrame:
+    """Read the availability CSV once per process with explicit dtypes.
+
+    The file does not change shape within a process, so re-reading and
+    re-inferring column types per manager instance is wasted I/O.
+    """
+    df = pd.read_csv(
+        "data/doctor_availability.csv",
+        usecols=["date_slot", "specialization", "doctor_name",
+                 "is_available", "patient_to_attend"],
+        dtype={"specialization": "category", "doctor_name": "category",
+               "is_available": "bool"}
+    )
+    # Sorted MultiIndex turns the boolean full-frame scans downstream into
+    # O(log N) .loc lookups per (doctor, slot)
+    return df.sort_values(["doctor_name", "date_slot"]).set_index(["doctor_name", "date_slot"])
+
 class ActionType(Enum):
     BOOK = "book"
     CANCEL = "cancel"
     VIEW = "view"
     RESCHEDULE = "reschedule"
 
-@dataclass
+class Intent(Enum):
+    """User intents recognized by MCPAgent, in routing priority order"""
+    CANCEL_APPT = "cancel_appt"
+    CONFIRM = "confirm"
+    DECLINE = "decline"
+    BOOK = "book"
+    AVAILABILITY = "availability"
+    VIEW = "view"
+    GENERAL = "general"
+
+@dataclass(slots=True)
 class AppointmentContext:
-    """Context for appointment operations"""
+    """Context for appointment operations
+
+    Slotted so each of the potentially thousands of live session contexts
+    carries fixed-offset fields instead of a per-instance __dict__.
+    """
     user_id: int
     doctor_name: str = None
     date_slot: str = None
     time_slot: str = None
     appointment_letter: str = None
     action_type: ActionType = None
+    # Structured view of the user's upcoming appointments, parsed once per
+    # listing so letter-based cancellation is an O(1) index lookup
+    appointments_index: list = None
 
 class MCPAppointmentManager:
     """MCP-based appointment management system"""
     
-    def __init__(self):
-        self.df = pd.read_csv("data/doctor_availability.csv")
-        self.contexts: Dict[str, AppointmentContext] = {}
-    
+    def __init__(self, max_sessions: int = 10_000):
+        self.df = _load_availability()
+        # Bounded LRU: least-recently-used session contexts are evicted
+        # once max_sessions is exceeded, so long-running servers don't leak.
+        # The lock keeps eviction and move_to_end safe when the web layer
+        # serves requests from multiple threads.
+        self.contexts: "OrderedDict[str, AppointmentContext]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self._lock = RLock()
+
     def create_context(self, session_id: str, user_id: int) -> str:
         """Create a new context for a session"""
         context = AppointmentContext(user_id=user_id)
-        self.contexts[session_id] = context
+        with self._lock:
+            self.contexts[session_id] = context
+            self.contexts.move_to_end(session_id)
+            while len(self.contexts) > self.max_sessions:
+                self.contexts.popitem(last=False)
         return session_id
-    
+
     def get_context(self, session_id: str) -> AppointmentContext:
         """Get context for a session"""
-        return self.contexts.get(session_id, None)
-    
+        with self._lock:
+            context = self.contexts.get(session_id, None)
+            if context is not None:
+                self.contexts.move_to_end(session_id)
+        return context
+
+    # Assignable AppointmentContext fields, precomputed so update_context
+    # validates keys with one set test instead of hasattr per kwarg
+    _FIELDS = frozenset({
+        "user_id", "doctor_name", "date_slot", "time_slot",
+        "appointment_letter", "action_type", "appointments_index",
+    })
+
     def update_context(self, session_id: str, **kwargs) -> None:
         """Update context for a session"""
-        if session_id in self.contexts:
-            context = self.contexts[session_id]
+        with self._lock:
+            context = self.contexts.get(session_id)
+            if context is None:
+                return
+            self.contexts.move_to_end(session_id)
+            # Slotted contexts have no __dict__, so write through the
+            # C-level slot descriptors after one set-membership check
             for key, value in kwargs.items():
-                if hasattr(context, key):
+                if key in self._FIELDS:
                     setattr(context, key, value)
-    
+
     def clear_context(self, session_id: str) -> None:
         """Clear context for a session"""
-        if session_id in self.contexts:
-            del self.contexts[session_id]
+        with self._lock:
+            if session_id in self.contexts:
+                del self.contexts[session_id]
+
+    def slots_for(self, doctor_name: str, date: str) -> pd.DataFrame:
+        """Indexed view of a doctor's slots on a DD-MM-YYYY date.
+
+        Uses the sorted (doctor_name, date_slot) MultiIndex, so the doctor
+        lookup is O(log N) instead of a full-frame boolean scan.
+        """
+        try:
+            doctor_slots = self.df.loc[doctor_name]
+        except KeyError:
+            return self.df.iloc[0:0].reset_index(level=0, drop=True)
+        return doctor_slots[doctor_slots.index.str.startswith(date)]
 
 class MCPBookingTool:
     """MCP Tool for appointment booking"""
@@ -77,16 +250,18 @@ class MCPBookingTool:
                                      action_type=ActionType.BOOK)
             
             # Use existing booking tool
-            datetime_model = DateTimeModel(date=f"{date_slot} {time_slot}")
-            id_model = IdentificationNumberModel(id=context.user_id)
+            datetime_model = _dt_model(f"{date_slot} {time_slot}")
+            id_model = _id_model(context.user_id)
             
-            result = set_appointment.invoke({
+            result = as_tool_result(set_appointment.invoke({
                 "desired_date": datetime_model,
                 "id_number": id_model,
                 "doctor_name": doctor_name
-            })
-            
-            if "Successfully done" in result:
+            }))
+
+            if result.ok:
+                # Booked slots must not be served from the availability cache
+                _availability_cached.cache_clear()
                 return {
                     "success": True,
                     "message": "Appointment booked successfully!",
@@ -98,9 +273,9 @@ class MCPBookingTool:
                     }
                 }
             else:
-                return {"success": False, "message": result}
-                
-        except Exception as e:
+                return {"success": False, "message": result.message}
+
+        except (ValidationError, KeyError, ValueError, IndexError) as e:
             return {"success": False, "message": f"Error booking appointment: {str(e)}"}
     
     def request_booking_confirmation(self, session_id: str, doctor_name: str, date_slot: str, time_slot: str) -> str:
@@ -115,108 +290,116 @@ class MCPBookingTool:
                                  time_slot=time_slot,
                                  action_type=ActionType.BOOK)
         
-        return f"""**🛡️ Booking Confirmation Required**
-
-**Appointment Details:**
-• Doctor: {doctor_name}
-• Date: {date_slot}
-• Time: {time_slot}
-• Patient ID: {context.user_id}
-
-**Do you want to book this appointment?**
-
-**Please respond:**
-• **'yes'** to confirm booking
-• **'no'** to cancel booking"""
+        return _BOOK_CONFIRM_TMPL.format_map({
+            "doctor": doctor_name,
+            "date": date_slot,
+            "time": time_slot,
+            "uid": context.user_id,
+        })
 
 class MCPCancellationTool:
     """MCP Tool for appointment cancellation"""
-    
+
     def __init__(self, manager: MCPAppointmentManager):
         self.manager = manager
-    
+
+    @staticmethod
+    def _parse_appointments(appointments_text: str) -> List[Dict[str, str]]:
+        """Parse the appointment listing into structured entries.
+
+        Returns one dict per upcoming (🟢) appointment, in listing order,
+        with the doctor name and the date in DD-MM-YYYY HH:MM format.
+        """
+        lines = appointments_text.split('\n')
+        # One regex match per line replaces the strip/isalpha/substring
+        # chain that scanned each line up to three times; the index is
+        # kept so the date lookup below doesn't rescan from the start
+        appointment_lines = [
+            (i, m.group(1)) for i, m in
+            ((i, _APPT_LINE_RE.match(line)) for i, line in enumerate(lines))
+            if m
+        ]
+
+        entries = []
+        for appointment_index, doctor_name in appointment_lines:
+
+            # Find corresponding date
+            date_line = None
+            for i in range(appointment_index + 1, min(appointment_index + 5, len(lines))):
+                if '📅 Date & Time:' in lines[i]:
+                    date_line = lines[i]
+                    break
+
+            formatted_date = "Unknown Date"
+            if date_line:
+                date_match = _DATE_IN_LINE_RE.search(date_line)
+                if date_match:
+                    date_str = date_match.group(1)
+                    time_str = date_match.group(2)
+                    try:
+                        dt = datetime.strptime(f"{date_str} {time_str}", "%A, %B %d, %Y %I:%M %p")
+                        formatted_date = dt.strftime("%d-%m-%Y %H:%M")
+                    except:
+                        pass
+
+            entries.append({"doctor": doctor_name, "date": formatted_date})
+
+        return entries
+
     def get_user_appointments_with_letters(self, session_id: str) -> Dict[str, Any]:
         """Get user appointments with letter system"""
         try:
             context = self.manager.get_context(session_id)
             if not context:
                 return {"success": False, "message": "No active session context"}
-            
+
             # Use existing tool
             result = get_user_appointments.invoke({
-                "id_number": IdentificationNumberModel(id=context.user_id)
+                "id_number": _id_model(context.user_id)
             })
-            
+
+            # Parse once and cache the structured index on the context so
+            # letter lookups don't re-parse the text
+            self.manager.update_context(session_id,
+                                     appointments_index=self._parse_appointments(result))
+
             return {"success": True, "appointments": result}
-            
-        except Exception as e:
+
+        except (ValidationError, KeyError, ValueError) as e:
             return {"success": False, "message": f"Error getting appointments: {str(e)}"}
-    
+
     def cancel_appointment_by_letter(self, session_id: str, appointment_letter: str) -> Dict[str, Any]:
         """Cancel appointment by letter (a, b, c, etc.)"""
         try:
             context = self.manager.get_context(session_id)
             if not context:
                 return {"success": False, "message": "No active session context"}
-            
-            # Convert letter to number
-            appointment_num = ord(appointment_letter.lower()) - ord('a') + 1
-            
-            # Get appointments to find the specific one
+
+            # Refresh the structured index (appointments may have changed)
             appointments_result = self.get_user_appointments_with_letters(session_id)
             if not appointments_result["success"]:
                 return appointments_result
-            
-            # Parse appointments to find the specific one
-            appointments_text = appointments_result["appointments"]
-            lines = appointments_text.split('\n')
-            appointment_lines = [line for line in lines if line.strip() and line.strip()[0].isalpha() and '. 🟢' in line]
-            
-            if appointment_num < 1 or appointment_num > len(appointment_lines):
+
+            appointments_index = context.appointments_index or []
+            appointment_idx = _LETTER_TO_IDX.get(appointment_letter.lower())
+
+            if appointment_idx is None or appointment_idx >= len(appointments_index):
                 return {
-                    "success": False, 
-                    "message": f"Invalid appointment letter. Please select between a and {chr(ord('a') + len(appointment_lines) - 1)}"
+                    "success": False,
+                    "message": f"Invalid appointment letter. Please select between a and {_IDX_TO_LETTER[len(appointments_index) - 1]}"
                 }
-            
-            # Extract appointment details
-            appointment_line = appointment_lines[appointment_num - 1]
-            doctor_name = appointment_line.split('. 🟢 Dr. ')[1].split('\n')[0] if '. 🟢 Dr. ' in appointment_line else "Unknown Doctor"
-            
-            # Convert to lowercase for validation
-            doctor_name_lower = doctor_name.lower()
-            
-            # Find corresponding date
-            appointment_index = lines.index(appointment_line)
-            date_line = None
-            for i in range(appointment_index + 1, min(appointment_index + 5, len(lines))):
-                if '📅 Date & Time:' in lines[i]:
-                    date_line = lines[i]
-                    break
-            
-            if date_line:
-                import re
-                date_match = re.search(r'(\w+day, \w+ \d+, \d+) at (\d+:\d+ [AP]M)', date_line)
-                if date_match:
-                    date_str = date_match.group(1)
-                    time_str = date_match.group(2)
-                    from datetime import datetime
-                    try:
-                        dt = datetime.strptime(f"{date_str} {time_str}", "%A, %B %d, %Y %I:%M %p")
-                        formatted_date = dt.strftime("%d-%m-%Y %H:%M")
-                    except:
-                        formatted_date = "Unknown Date"
-                else:
-                    formatted_date = "Unknown Date"
-            else:
-                formatted_date = "Unknown Date"
-            
+
+            entry = appointments_index[appointment_idx]
+            doctor_name = entry["doctor"]
+            formatted_date = entry["date"]
+
             # Update context
             self.manager.update_context(session_id,
-                                     doctor_name=doctor_name_lower,
+                                     doctor_name=doctor_name.lower(),
                                      date_slot=formatted_date,
                                      appointment_letter=appointment_letter,
                                      action_type=ActionType.CANCEL)
-            
+
             return {
                 "success": True,
                 "appointment_details": {
@@ -226,8 +409,8 @@ class MCPCancellationTool:
                     "patient_id": context.user_id
                 }
             }
-            
-        except Exception as e:
+
+        except (ValidationError, KeyError, ValueError, IndexError) as e:
             return {"success": False, "message": f"Error cancelling appointment: {str(e)}"}
     
     def execute_cancellation(self, session_id: str) -> Dict[str, Any]:
@@ -241,16 +424,16 @@ class MCPCancellationTool:
                 return {"success": False, "message": "No pending cancellation"}
             
             # Use existing cancellation tool
-            datetime_model = DateTimeModel(date=context.date_slot)
-            id_model = IdentificationNumberModel(id=context.user_id)
+            datetime_model = _dt_model(context.date_slot)
+            id_model = _id_model(context.user_id)
             
-            result = cancel_appointment.invoke({
+            result = as_tool_result(cancel_appointment.invoke({
                 "date": datetime_model,
                 "id_number": id_model,
                 "doctor_name": context.doctor_name
-            })
-            
-            if "Successfully cancelled" in result:
+            }))
+
+            if result.ok:
                 # Clear context after successful cancellation
                 self.manager.clear_context(session_id)
                 return {
@@ -263,9 +446,9 @@ class MCPCancellationTool:
                     }
                 }
             else:
-                return {"success": False, "message": result}
-                
-        except Exception as e:
+                return {"success": False, "message": result.message}
+
+        except (ValidationError, KeyError, ValueError) as e:
             return {"success": False, "message": f"Error executing cancellation: {str(e)}"}
     
     def request_cancellation_confirmation(self, session_id: str, appointment_letter: str) -> str:
@@ -278,18 +461,11 @@ class MCPCancellationTool:
         appointment_details = result["appointment_details"]
         context = self.manager.get_context(session_id)
         
-        return f"""**🛡️ Cancellation Confirmation Required**
-
-**Appointment Details:**
-• Doctor: {appointment_details['doctor']}
-• Date: {appointment_details['date']}
-• Patient ID: {context.user_id}
-
-**Do you want to cancel this appointment?**
-
-**Please respond:**
-• **'yes'** to confirm cancellation
-• **'no'** to keep the appointment"""
+        return _CANCEL_CONFIRM_TMPL.format_map({
+            "doctor": appointment_details['doctor'],
+            "date": appointment_details['date'],
+            "uid": context.user_id,
+        })
 
 class MCPAgent:
     """Main MCP Agent that coordinates all tools"""
@@ -301,241 +477,255 @@ class MCPAgent:
     
     def process_request(self, session_id: str, user_id: int, message: str) -> Dict[str, Any]:
         """Process user request using MCP tools"""
-        import re
-        
         # Create context if it doesn't exist
         if session_id not in self.manager.contexts:
             self.manager.create_context(session_id, user_id)
-        
-        message_lower = message.lower()
-        
-        # Handle cancellation requests
-        if 'cancel' in message_lower and 'appointment' in message_lower:
-            # Extract appointment letter
-            appointment_match = re.search(r'appointment #?([a-z]|\d+)', message_lower)
-            if appointment_match:
-                appointment_ref = appointment_match.group(1)
-                if appointment_ref.isalpha():
-                    # Letter-based cancellation
-                    confirmation_message = self.cancellation_tool.request_cancellation_confirmation(session_id, appointment_ref)
-                    return {
-                        "action": "cancellation_confirmation",
-                        "message": confirmation_message,
-                        "requires_confirmation": True
-                    }
-                else:
-                    # Number-based cancellation (convert to letter)
-                    appointment_letter = chr(ord('a') + int(appointment_ref) - 1)
-                    confirmation_message = self.cancellation_tool.request_cancellation_confirmation(session_id, appointment_letter)
-                    return {
-                        "action": "cancellation_confirmation",
-                        "message": confirmation_message,
-                        "requires_confirmation": True
-                    }
+
+        # casefold once: single lowercase pass shared by classification and
+        # every handler, correct for non-ASCII input where lower() is not
+        message_cf = message.casefold()
+        tokens = frozenset(_TOKEN_RE.findall(message_cf))
+
+        intent = self._classify(message_cf, tokens)
+        return self._HANDLERS[intent](self, session_id, message, message_cf, tokens)
+
+    @staticmethod
+    def _classify(message_cf: str, tokens: frozenset) -> Intent:
+        """Classify the message into a single intent, in priority order"""
+        if 'cancel' in message_cf and 'appointment' in message_cf:
+            return Intent.CANCEL_APPT
+        if tokens & _INTENT_YES:
+            return Intent.CONFIRM
+        if tokens & _INTENT_NO:
+            return Intent.DECLINE
+        if tokens & _BOOK_VERBS and tokens & _BOOK_OBJS:
+            return Intent.BOOK
+        if tokens & _AVAIL_WORDS and tokens & _DOCTOR_WORDS:
+            return Intent.AVAILABILITY
+        if any(phrase in message_cf for phrase in _VIEW_PHRASES):
+            return Intent.VIEW
+        return Intent.GENERAL
+
+    def _handle_cancel(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Handle cancellation requests"""
+        # Extract appointment letter
+        appointment_match = _APPT_RE.search(message_cf)
+        if appointment_match:
+            appointment_ref = appointment_match.group(1)
+            if appointment_ref.isalpha():
+                # Letter-based cancellation
+                appointment_letter = appointment_ref
             else:
-                # Show appointments for cancellation
-                appointments_result = self.cancellation_tool.get_user_appointments_with_letters(session_id)
-                if appointments_result["success"]:
-                    return {
-                        "action": "show_appointments",
-                        "message": f"**Your Appointments:**\n\n{appointments_result['appointments']}\n\n**To cancel an appointment, please tell me which one (a, b, c, etc.)**"
-                    }
-                else:
-                    return {
-                        "action": "error",
-                        "message": appointments_result["message"]
-                    }
-        
-        # Handle confirmation responses
-        elif any(word in message_lower for word in ['yes', 'confirm', 'proceed']):
-            context = self.manager.get_context(session_id)
-            if context and context.action_type == ActionType.CANCEL:
-                # Execute cancellation
-                result = self.cancellation_tool.execute_cancellation(session_id)
-                if result["success"]:
-                    return {
-                        "action": "cancellation_completed",
-                        "message": f"**✅ {result['message']}**\n\n**Cancelled Appointment:**\n• Doctor: {result['cancelled_appointment']['doctor']}\n• Date: {result['cancelled_appointment']['date']}\n• Patient ID: {result['cancelled_appointment']['patient_id']}"
-                    }
-                else:
-                    return {
-                        "action": "error",
-                        "message": f"**❌ Cancellation Failed:** {result['message']}"
-                    }
-            elif context and context.action_type == ActionType.BOOK:
-                # Execute booking
-                result = self.booking_tool.book_appointment(session_id, context.doctor_name, context.date_slot, context.time_slot)
-                if result["success"]:
-                    return {
-                        "action": "booking_completed",
-                        "message": f"**✅ {result['message']}**\n\n**Booked Appointment:**\n• Doctor: {result['appointment_details']['doctor']}\n• Date: {result['appointment_details']['date']}\n• Time: {result['appointment_details']['time']}\n• Patient ID: {result['appointment_details']['patient_id']}"
-                    }
-                else:
-                    return {
-                        "action": "error",
-                        "message": f"**❌ Booking Failed:** {result['message']}"
-                    }
+                # Number-based cancellation (convert to letter)
+                appointment_letter = _IDX_TO_LETTER[int(appointment_ref) - 1]
+            confirmation_message = self.cancellation_tool.request_cancellation_confirmation(session_id, appointment_letter)
+            return {
+                "action": "cancellation_confirmation",
+                "message": confirmation_message,
+                "requires_confirmation": True
+            }
+        else:
+            # Show appointments for cancellation
+            appointments_result = self.cancellation_tool.get_user_appointments_with_letters(session_id)
+            if appointments_result["success"]:
+                return {
+                    "action": "show_appointments",
+                    "message": f"**Your Appointments:**\n\n{appointments_result['appointments']}\n\n**To cancel an appointment, please tell me which one (a, b, c, etc.)**"
+                }
             else:
                 return {
                     "action": "error",
-                    "message": "No pending action to confirm"
+                    "message": appointments_result["message"]
                 }
-        
-        # Handle decline responses
-        elif any(word in message_lower for word in ['no', 'cancel', 'abort']):
-            context = self.manager.get_context(session_id)
-            if context and context.action_type == ActionType.CANCEL:
-                self.manager.clear_context(session_id)
+
+    def _handle_confirm(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Handle confirmation responses"""
+        context = self.manager.get_context(session_id)
+        if context and context.action_type == ActionType.CANCEL:
+            # Execute cancellation
+            result = self.cancellation_tool.execute_cancellation(session_id)
+            if result["success"]:
                 return {
-                    "action": "cancellation_cancelled",
-                    "message": "**✅ Cancellation Cancelled**\n\nYour appointment has been kept. Is there anything else I can help you with?"
+                    "action": "cancellation_completed",
+                    "message": f"**✅ {result['message']}**\n\n**Cancelled Appointment:**\n• Doctor: {result['cancelled_appointment']['doctor']}\n• Date: {result['cancelled_appointment']['date']}\n• Patient ID: {result['cancelled_appointment']['patient_id']}"
                 }
-            elif context and context.action_type == ActionType.BOOK:
-                self.manager.clear_context(session_id)
+            else:
+                return {
+                    "action": "error",
+                    "message": f"**❌ Cancellation Failed:** {result['message']}"
+                }
+        elif context and context.action_type == ActionType.BOOK:
+            # Execute booking
+            result = self.booking_tool.book_appointment(session_id, context.doctor_name, context.date_slot, context.time_slot)
+            if result["success"]:
                 return {
-                    "action": "booking_cancelled",
-                    "message": "**✅ Booking Cancelled**\n\nNo appointment was booked. Is there anything else I can help you with?"
+                    "action": "booking_completed",
+                    "message": f"**✅ {result['message']}**\n\n**Booked Appointment:**\n• Doctor: {result['appointment_details']['doctor']}\n• Date: {result['appointment_details']['date']}\n• Time: {result['appointment_details']['time']}\n• Patient ID: {result['appointment_details']['patient_id']}"
                 }
             else:
                 return {
                     "action": "error",
-                    "message": "No pending action to cancel"
+                    "message": f"**❌ Booking Failed:** {result['message']}"
                 }
-        
-        # Handle booking requests
-        elif any(word in message_lower for word in ['book', 'schedule', 'appointment']) and any(word in message_lower for word in ['slot', 'dr.', 'doctor']):
-            import re
-            
-            # Extract booking details from query - handle multiple formats
-            doctor_match = None
-            
-            # Try "Doctor: Name (Specialization)" format first
-            doctor_match = re.search(r'doctor:\s*([a-zA-Z\s]+)(?:\s*\([^)]+\))?', message_lower)
-            if not doctor_match:
-                # Try "Dr. Name" format
-                doctor_match = re.search(r'dr\.?\s*([a-zA-Z\s]+?)(?:\s+\([^)]+\))?', message_lower)
-            if not doctor_match:
-                # Try "doctor Name" format
-                doctor_match = re.search(r'doctor\s+([a-zA-Z\s]+?)(?:\s+\([^)]+\))?', message_lower)
-            
-            # Look for date patterns
-            date_match = re.search(r'(\d{2}-\d{2}-\d{4})', message)
-            
-            # Look for slot number
-            slot_match = re.search(r'slot\s*(\d+)', message_lower)
-            
-            if doctor_match and date_match and slot_match:
-                doctor_name = doctor_match.group(1).strip().lower()
-                date_str = date_match.group(1)
-                slot_number = int(slot_match.group(1))
-                
-                # Get available slots to find the time
-                try:
-                    from data_models.models import DateModel
-                    result = check_availability_by_doctor.invoke({
-                        "desired_date": DateModel(date=date_str),
-                        "doctor_name": doctor_name
-                    })
-                    
-                    if "Available slots:" in result:
-                        slots_text = result.split("Available slots:")[1].strip()
-                        available_slots = [slot.strip() for slot in slots_text.split(',') if slot.strip()]
-                        
-                        if 1 <= slot_number <= len(available_slots):
-                            time_slot = available_slots[slot_number - 1]
-                            
-                            # Request booking confirmation
-                            confirmation_message = self.booking_tool.request_booking_confirmation(session_id, doctor_name, date_str, time_slot)
-                            return {
-                                "action": "booking_confirmation",
-                                "message": confirmation_message,
-                                "requires_confirmation": True
-                            }
-                        else:
-                            return {
-                                "action": "error",
-                                "message": f"Invalid slot number. Please select between 1 and {len(available_slots)}"
-                            }
+        else:
+            return {
+                "action": "error",
+                "message": "No pending action to confirm"
+            }
+
+    def _handle_decline(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Handle decline responses"""
+        context = self.manager.get_context(session_id)
+        if context and context.action_type == ActionType.CANCEL:
+            self.manager.clear_context(session_id)
+            return {
+                "action": "cancellation_cancelled",
+                "message": "**✅ Cancellation Cancelled**\n\nYour appointment has been kept. Is there anything else I can help you with?"
+            }
+        elif context and context.action_type == ActionType.BOOK:
+            self.manager.clear_context(session_id)
+            return {
+                "action": "booking_cancelled",
+                "message": "**✅ Booking Cancelled**\n\nNo appointment was booked. Is there anything else I can help you with?"
+            }
+        else:
+            return {
+                "action": "error",
+                "message": "No pending action to cancel"
+            }
+
+    def _handle_book(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Handle booking requests"""
+        # Extract booking details from query - handle multiple formats
+        # Try "Doctor: Name (Specialization)" format first
+        doctor_match = _DOCTOR_COLON_RE.search(message_cf)
+        if not doctor_match:
+            # Try "Dr. Name" format
+            doctor_match = _DR_RE.search(message_cf)
+        if not doctor_match:
+            # Try "doctor Name" format
+            doctor_match = _DOCTOR_RE.search(message_cf)
+
+        # Look for date patterns
+        date_match = _DATE_RE.search(message)
+
+        # Look for slot number
+        slot_match = _SLOT_RE.search(message_cf)
+
+        if doctor_match and date_match and slot_match:
+            doctor_name = doctor_match.group(1).strip()  # already casefolded
+            date_str = date_match.group(1)
+            slot_number = int(slot_match.group(1))
+
+            # Get available slots to find the time
+            try:
+                result = _check_availability(doctor_name, date_str)
+
+                # partition scans once; split-on-marker would rescan the
+                # result for the membership test and again for the split
+                _, sep, slots_text = result.partition("Available slots:")
+                if sep:
+                    available_slots = [s for s in map(str.strip, slots_text.split(',')) if s]
+
+                    if 1 <= slot_number <= len(available_slots):
+                        time_slot = available_slots[slot_number - 1]
+
+                        # Request booking confirmation
+                        confirmation_message = self.booking_tool.request_booking_confirmation(session_id, doctor_name, date_str, time_slot)
+                        return {
+                            "action": "booking_confirmation",
+                            "message": confirmation_message,
+                            "requires_confirmation": True
+                        }
                     else:
                         return {
                             "action": "error",
-                            "message": f"No availability found for Dr. {doctor_name.title()} on {date_str}"
+                            "message": f"Invalid slot number. Please select between 1 and {len(available_slots)}"
                         }
-                except Exception as e:
-                    return {
-                        "action": "error",
-                        "message": f"Error checking availability: {str(e)}"
-                    }
-            else:
-                return {
-                    "action": "error",
-                    "message": "I need doctor name, date, and slot number to book an appointment.\n\nExample: 'Book slot 1 with Dr. John Doe on 15-09-2025'"
-                }
-        
-        # Handle availability checking
-        elif any(word in message_lower for word in ['check', 'availability', 'available']) and any(word in message_lower for word in ['dr.', 'doctor']):
-            import re
-            
-            # Extract doctor name and date from query
-            doctor_match = re.search(r'dr\.?\s*([a-zA-Z\s]+?)(?:\s+on|\s+\d{2}-\d{2}-\d{4})', message_lower)
-            if not doctor_match:
-                doctor_match = re.search(r'doctor\s+([a-zA-Z\s]+?)(?:\s+on|\s+\d{2}-\d{2}-\d{4})', message_lower)
-            
-            # Look for date patterns
-            date_match = re.search(r'(\d{2}-\d{2}-\d{4})', message)
-            
-            if doctor_match and date_match:
-                doctor_name = doctor_match.group(1).strip()
-                date_str = date_match.group(1)
-                
-                # Use the tool to check availability
-                try:
-                    from data_models.models import DateModel
-                    result = check_availability_by_doctor.invoke({
-                        "desired_date": DateModel(date=date_str),
-                        "doctor_name": doctor_name
-                    })
-                    
-                    if "Available slots:" in result:
-                        response = f"**📅 Available time slots for {doctor_name.title()} on {date_str}:**\n\n{result}"
-                    else:
-                        response = f"**❌ No availability found for Dr. {doctor_name.title()} on {date_str}**\n\nPlease try a different date or doctor."
-                    
-                    return {
-                        "action": "show_availability",
-                        "message": response
-                    }
-                except Exception as e:
+                else:
                     return {
                         "action": "error",
-                        "message": f"**❌ Error checking availability:** {str(e)}"
+                        "message": f"No availability found for Dr. {doctor_name.title()} on {date_str}"
                     }
-            else:
+            except (ValidationError, KeyError, ValueError, IndexError) as e:
                 return {
                     "action": "error",
-                    "message": "I need both the doctor name and date to check availability. Please try again.\n\nExample: 'Check availability for Dr. John Doe on 18-09-2025'"
+                    "message": f"Error checking availability: {str(e)}"
                 }
-        
-        # Handle view appointments
-        elif any(word in message_lower for word in ['my appointments', 'show appointments', 'view appointments']):
-            appointments_result = self.cancellation_tool.get_user_appointments_with_letters(session_id)
-            if appointments_result["success"]:
+        else:
+            return {
+                "action": "error",
+                "message": "I need doctor name, date, and slot number to book an appointment.\n\nExample: 'Book slot 1 with Dr. John Doe on 15-09-2025'"
+            }
+
+    def _handle_availability(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Handle availability checking"""
+        # Extract doctor name and date from query
+        doctor_match = _DR_BEFORE_DATE_RE.search(message_cf)
+        if not doctor_match:
+            doctor_match = _DOCTOR_BEFORE_DATE_RE.search(message_cf)
+
+        # Look for date patterns
+        date_match = _DATE_RE.search(message)
+
+        if doctor_match and date_match:
+            doctor_name = doctor_match.group(1).strip()
+            date_str = date_match.group(1)
+
+            # Use the tool to check availability
+            try:
+                result = _check_availability(doctor_name, date_str)
+
+                if "Available slots:" in result:
+                    response = f"**📅 Available time slots for {doctor_name.title()} on {date_str}:**\n\n{result}"
+                else:
+                    response = f"**❌ No availability found for Dr. {doctor_name.title()} on {date_str}**\n\nPlease try a different date or doctor."
+
                 return {
-                    "action": "show_appointments",
-                    "message": appointments_result["appointments"]
+                    "action": "show_availability",
+                    "message": response
                 }
-            else:
+            except (ValidationError, KeyError, ValueError) as e:
                 return {
                     "action": "error",
-                    "message": appointments_result["message"]
+                    "message": f"**❌ Error checking availability:** {str(e)}"
                 }
-        
-        # Default response
         else:
             return {
-                "action": "general",
-                "message": "I'm here to help you with appointment booking and cancellation. What would you like to do?"
+                "action": "error",
+                "message": "I need both the doctor name and date to check availability. Please try again.\n\nExample: 'Check availability for Dr. John Doe on 18-09-2025'"
             }
 
+    def _handle_view(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Handle view appointments"""
+        appointments_result = self.cancellation_tool.get_user_appointments_with_letters(session_id)
+        if appointments_result["success"]:
+            return {
+                "action": "show_appointments",
+                "message": appointments_result["appointments"]
+            }
+        else:
+            return {
+                "action": "error",
+                "message": appointments_result["message"]
+            }
+
+    def _handle_general(self, session_id: str, message: str, message_cf: str, tokens: frozenset) -> Dict[str, Any]:
+        """Default response"""
+        return {
+            "action": "general",
+            "message": "I'm here to help you with appointment booking and cancellation. What would you like to do?"
+        }
+
+    _HANDLERS = {
+        Intent.CANCEL_APPT: _handle_cancel,
+        Intent.CONFIRM: _handle_confirm,
+        Intent.DECLINE: _handle_decline,
+        Intent.BOOK: _handle_book,
+        Intent.AVAILABILITY: _handle_availability,
+        Intent.VIEW: _handle_view,
+        Intent.GENERAL: _handle_general,
+    }
+
 # Global MCP Agent instance
 mcp_agent = MCPAgent()
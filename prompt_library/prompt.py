@@ -1,3 +1,12 @@
+import sys
+
+# Optional: pre-tokenize the system prompt when tiktoken is installed
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
 members_dict = {'information_node':'specialized agent to provide information related to availability of doctors or any FAQs related to hospital.','booking_node':'specialized agent to only to book, cancel or reschedule appointment'}
 
 options = list(members_dict.keys()) + ["FINISH"]
@@ -44,3 +53,13 @@ system_prompt = (
     "**IMPORTANT:** Never show internal routing, worker assignments, or technical details to the user. "
     "Keep responses clean, professional, and focused on the patient's needs."
 )
+
+# Intern the prompt so identity-keyed caches downstream hit fast
+system_prompt = sys.intern(system_prompt)
+
+# Token IDs for clients that accept pre-tokenized input; None when tiktoken
+# is not installed (callers fall back to the plain string)
+system_prompt_tokens = None
+if TIKTOKEN_AVAILABLE:
+    _ENC = tiktoken.get_encoding("cl100k_base")
+    system_prompt_tokens = _ENC.encode(system_prompt)
@@ -1,19 +1,81 @@
+import re
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import time
+
+# orjson parses the nested message payloads several times faster than the
+# stdlib json module; fall back transparently when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-API_URL = "http://127.0.0.1:8000/execute" 
+API_URL = "http://127.0.0.1:8000/execute"
+STREAM_URL = API_URL + "/stream"
 DEBUG_URL = "http://127.0.0.1:8003"
 
+# Appointment-detail patterns, compiled once instead of per extraction call
+_DOCTOR_RE = re.compile(r'Dr\.\s+([^<]+)')
+_DATETIME_RE = re.compile(r'Date & Time:\s*([^<]+)')
+_SPEC_RE = re.compile(r'Specialization:\s*([^<]+)')
+
+# One pass over the whole appointment listing: captures reference, status
+# marker, doctor, date/time, specialization and status per block, replacing
+# the per-line startswith state machine in the My Appointments tab
+_APPT_BLOCK_RE = re.compile(
+    r'(\w{1,2})\.\s*(❌|✅|🟢|📋)?\s*Dr\.\s+([^\n]+)'
+    r'.*?Date & Time:\s*([^\n]+)'
+    r'.*?Specialization:\s*([^\n]+)'
+    r'.*?Status:\s*([^\n]+)',
+    re.S)
+
+# Both availability reply shapes in one scan: a comma-separated
+# "Available slots:" list, or numbered "1. 08:00" lines
+_SLOTS_RE = re.compile(r'Available slots:\s*([^\n]+)|^\s*\d+\.\s*(\d{1,2}:\d{2})', re.M)
+
+# Status marker -> (status, border color, background color), one dict
+# lookup per appointment instead of a chain of comparisons
+_STATUS_STYLES = {
+    '❌': ('CANCELLED', '#f44336', '#ffebee'),
+    '✅': ('COMPLETED', '#4caf50', '#e8f5e8'),
+    '🟢': ('UPCOMING', '#2196f3', '#f9f9f9'),
+}
+_DEFAULT_STYLE = ('ACTIVE', '#2196f3', '#f9f9f9')
+
+# Summary body lines (✓/✗ bullets) in one multiline scan; the pattern
+# itself excludes the 'Summary:' header, so each line is classified with
+# a single regex match instead of a chain of strip/startswith tests
+_SUMMARY_LINE_RE = re.compile(r'^\s*([✓✗][^\n]*)', re.M)
+
+# One card per appointment, rendered with a single format call instead of
+# building the inner content and the wrapper div as separate strings
+_APPT_CARD_TMPL = (
+    '<div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; '
+    'margin: 10px 0; border-left: 4px solid {border_color}; '
+    'box-shadow: 0 2px 4px rgba(0,0,0,0.1);">'
+    '<strong>{ref}. {marker} Dr. {doctor}</strong><br>'
+    "<span style='color: #1976d2; font-weight: bold;'>📅 Date & Time: {date_time}</span><br>"
+    "<span style='color: #388e3c;'>🏥 Specialization: {spec}</span><br>"
+    '📊 Status: {status_text}<br>'
+    '</div>'
+)
+
 # Initialize session state for conversation memory
-if 'session_id' not in st.session_state:
-    st.session_state.session_id = None
-if 'conversation_history' not in st.session_state:
-    st.session_state.conversation_history = []
-if 'debug_data' not in st.session_state:
-    st.session_state.debug_data = {}
+_SESSION_DEFAULTS = {
+    'session_id': None,
+    'conversation_history': [],
+    'debug_data': {},
+    'my_appointments_data': [],
+}
+for _key, _value in _SESSION_DEFAULTS.items():
+    st.session_state.setdefault(_key, _value)
 
 # Page configuration
 st.set_page_config(
@@ -30,23 +92,122 @@ st.markdown("**Simple appointment booking: Select doctor → Check availability
 # Create tabs
 tab1, tab2 = st.tabs(["Book Appointment", "My Appointments"])
 
+@st.cache_resource
+def get_session():
+    """Process-wide requests.Session with connection pooling.
+
+    Keep-alive reuses the TCP connection to the backend across reruns and
+    users instead of paying DNS + handshake on every POST.
+    """
+    session = requests.Session()
+    # Retry transient backend errors at the adapter so hiccups don't
+    # surface as failed clicks the user has to repeat
+    retries = Retry(total=2, backoff_factor=0.2,
+                    status_forcelist=[502, 503, 504],
+                    allowed_methods=frozenset(['GET', 'POST']))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+@st.cache_resource
+def get_executor():
+    """Process-wide worker pool for backend calls that shouldn't block.
+
+    st.cache_resource keeps one pool for all sessions — a module global
+    would be re-created on script reloads, leaking threads, and
+    per-session pools would defeat the bounded worker count.
+    """
+    return ThreadPoolExecutor(max_workers=8)
+
+def _post_json(payload: dict, timeout: int = 30):
+    """POST a JSON payload to the backend, encoding the body exactly once.
+
+    Preparing the request up front means retries resend the same encoded
+    bytes instead of rebuilding and re-serializing the payload.
+    """
+    session = get_session()
+    prepared = session.prepare_request(requests.Request('POST', API_URL, json=payload))
+    return session.send(prepared, verify=False, timeout=timeout)
+
+def _parse_slots(result):
+    """Extract the available time slots from a backend availability reply"""
+    available_slots = []
+    for msg in result.get('new_messages', []):
+        if msg.get('type') == 'ai':
+            content = msg.get('content', '')
+            # Cheap sentinel first so non-availability replies skip the scan
+            if 'Available' not in content:
+                continue
+            # One compiled-regex pass covers both reply shapes, replacing
+            # the branchy split-based line handling
+            for comma_list, single in _SLOTS_RE.findall(content):
+                if comma_list:
+                    available_slots.extend(
+                        s for s in map(str.strip, comma_list.split(',')) if s)
+                elif single:
+                    available_slots.append(single)
+            if available_slots:
+                break
+    return available_slots
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_availability(doctor: str, date: str, id_number: int) -> list:
+    """Availability slots for (doctor, date), cached across reruns.
+
+    Repeat selections of the same combination are served from Streamlit's
+    global cache instead of another backend round-trip. The short TTL
+    keeps freshly-booked slots from lingering.
+    """
+    request_data = {
+        'messages': f"Check availability for Dr. {doctor.replace('_', ' ').title()} on {date}",
+        'id_number': id_number
+    }
+    response = _post_json(request_data)
+    response.raise_for_status()
+    return _parse_slots(_json_loads(response.content))
+
+def _normalize_content(content):
+    """Message content as plain text, fast-pathing the common str case.
+
+    Structured (list-of-parts) content is joined in one pass instead of
+    concatenating strings item by item.
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        text = ''.join(
+            item.get('text', '') if isinstance(item, dict) and item.get('type') == 'text'
+            else (item if isinstance(item, str) else '')
+            for item in content
+        )
+        return text if text else str(content)
+    return str(content)
+
 # Helper function to extract appointment details from appointment content
 def _extract_appointment_details(appointment_content):
     """Extract doctor name, date, and time from appointment content"""
-    import re
-    
+    # Cheap substring test first: skip all three regexes for content that
+    # clearly isn't an appointment block
+    if 'Dr.' not in appointment_content:
+        return {
+            'doctor': "Unknown Doctor",
+            'date_time': "Unknown Date",
+            'specialization': "Unknown Specialization"
+        }
+
     # Extract doctor name (look for "Dr. Name" pattern)
-    doctor_match = re.search(r'Dr\.\s+([^<]+)', appointment_content)
+    doctor_match = _DOCTOR_RE.search(appointment_content)
     doctor_name = doctor_match.group(1).strip() if doctor_match else "Unknown Doctor"
-    
+
     # Extract date and time
-    date_time_match = re.search(r'Date & Time:\s*([^<]+)', appointment_content)
+    date_time_match = _DATETIME_RE.search(appointment_content)
     date_time = date_time_match.group(1).strip() if date_time_match else "Unknown Date"
-    
+
     # Extract specialization
-    specialization_match = re.search(r'Specialization:\s*([^<]+)', appointment_content)
+    specialization_match = _SPEC_RE.search(appointment_content)
     specialization = specialization_match.group(1).strip() if specialization_match else "Unknown Specialization"
-    
+
     return {
         'doctor': doctor_name,
         'date_time': date_time,
@@ -67,29 +228,19 @@ def _handle_direct_cancellation(appointment_num, appointment_details, user_id):
         if st.session_state.session_id:
             request_data['session_id'] = st.session_state.session_id
         
-        response = requests.post(API_URL, json=request_data, verify=False)
+        response = _post_json(request_data)
         
         if response.status_code == 200:
-            result = response.json()
+            result = _json_loads(response.content)
             st.session_state.session_id = result.get('session_id')
             
-            # Update conversation history with the cancellation response
-            if 'conversation_history' not in st.session_state:
-                st.session_state.conversation_history = []
-            
-            # Add the cancellation request and response to conversation history
-            st.session_state.conversation_history.append({
-                'content': f"Cancel appointment #{appointment_num}",
-                'type': 'human'
-            })
-            
-            # Add the AI response
-            if result.get('messages'):
-                for msg in result.get('messages', []):
-                    if msg.get('type') == 'ai':
-                        st.session_state.conversation_history.append(msg)
-                        break
+            # The backend reply is already just this turn's delta
+            # (request + response), so it appends directly
+            st.session_state.conversation_history.extend(result.get('new_messages', []))
             
+            # Drop the cached listing so the next render refetches it
+            fetch_appointments.clear()
+
             st.success(f"✅ Cancellation request sent for appointment #{appointment_num}")
         else:
             st.error(f"Error cancelling appointment: {response.status_code}")
@@ -98,46 +249,93 @@ def _handle_direct_cancellation(appointment_num, appointment_details, user_id):
 
 # Helper function to format messages nicely
 
-# Sidebar with quick actions
-with st.sidebar:
-    st.header("Quick Actions")
-    
-    # Load data from CSV
-    import pandas as pd
-    df = pd.read_csv("data/doctor_availability.csv")
-    
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_appointments(patient_id: int) -> list:
+    """Appointment listing for a patient, cached briefly across reruns.
+
+    Navigating away and back within the TTL reuses the parsed payload
+    instead of another backend call; a successful cancellation clears the
+    cache so the list refreshes immediately.
+    """
+    request_data = {
+        'messages': 'show my appointments',
+        'id_number': patient_id
+    }
+    response = _post_json(request_data)
+    response.raise_for_status()
+    return _json_loads(response.content).get('new_messages', [])
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_doctor_catalog():
+    """Load the doctor catalog once per process instead of on every rerun.
+
+    Returns the doctor/specialization frame and the sorted list of
+    available dates; cached so each keystroke doesn't re-read the CSV and
+    redo the groupby work.
+    """
+    # Only the catalog columns are needed here; skipping the rest cuts
+    # both parse time and memory
+    df = pd.read_csv("data/doctor_availability.csv",
+                     usecols=['doctor_name', 'specialization', 'date_slot'])
+
     # Get unique doctors with their specializations
     doctor_specs = df.groupby(['doctor_name', 'specialization']).size().reset_index()
     doctor_specs['display_name'] = doctor_specs['doctor_name'].str.replace('_', ' ').str.title()
     doctor_specs['spec_display'] = doctor_specs['specialization'].str.replace('_', ' ').str.title()
-    
+
+    # Build the selectbox options here, vectorized over the columns, so
+    # the per-rerun iterrows loop disappears
+    doctor_options = ["Choose a doctor..."] + [
+        f"{d} ({s})"
+        for d, s in zip(doctor_specs['display_name'], doctor_specs['spec_display'])
+    ]
+
+    # O(1) display-name -> raw CSV name lookup, replacing the per-rerun
+    # boolean-mask scan over the frame
+    display_to_raw = dict(zip(doctor_specs['display_name'], doctor_specs['doctor_name']))
+
+    # date_slot starts with a fixed-width DD-MM-YYYY prefix, so a vectorized
+    # slice gets the date without per-row Python split lists
+    available_dates = sorted(df['date_slot'].str.slice(0, 10).unique().tolist())
+    return doctor_options, display_to_raw, available_dates
+
+# Sidebar with quick actions
+with st.sidebar:
+    st.header("Quick Actions")
+
+    doctor_options, display_to_raw, available_dates = load_doctor_catalog()
+
     # Available doctors with specializations
     st.subheader("Available Doctors")
-    doctor_options = ["Choose a doctor..."]
-    for _, row in doctor_specs.iterrows():
-        doctor_options.append(f"{row['display_name']} ({row['spec_display']})")
-    
     selected_doctor_display = st.selectbox("Select a doctor:", doctor_options)
-    
+
     # Extract doctor name for processing
     selected_doctor = None
     if selected_doctor_display != "Choose a doctor...":
         # Get the original doctor name from the CSV data
         display_name = selected_doctor_display.split(" (")[0]
-        # Find the matching doctor name in the CSV
-        matching_doctor = doctor_specs[doctor_specs['display_name'] == display_name]['doctor_name'].iloc[0]
-        selected_doctor = matching_doctor
+        selected_doctor = display_to_raw[display_name]
     
     # Available dates from CSV
     st.subheader("Available Dates")
-    available_dates = sorted(df['date_slot'].str.split(' ').str[0].unique())
     date_options = ["Choose a date..."] + available_dates
     selected_date = st.selectbox("Select a date:", date_options)
     
     # Quick query buttons
     st.subheader("Quick Start")
-    
-    # Auto-check availability when both doctor and date are selected
+
+    # Prefetch availability for the next few dates as soon as a doctor is
+    # chosen: the calls overlap on the worker pool (bounded by its 4
+    # threads) and land in the fetch_availability cache, so picking a date
+    # usually renders its slots instantly
+    if selected_doctor and st.session_state.get('availability_prefetch_doctor') != selected_doctor:
+        st.session_state.availability_prefetch_doctor = selected_doctor
+        for d in available_dates[:5]:
+            get_executor().submit(fetch_availability, selected_doctor, d, 1234567)
+
+    # Auto-check availability when both doctor and date are selected.
+    # The backend call runs on a background future so the rerun returns
+    # immediately and the rest of the page stays interactive.
     if selected_doctor and selected_date != "Choose a date...":
         # Check if we need to fetch availability
         cache_key = f"{selected_doctor}_{selected_date}"
@@ -145,49 +343,37 @@ with st.sidebar:
             # Clear any previous slots when checking new combination
             if 'available_slots' in st.session_state:
                 del st.session_state['available_slots']
-            with st.spinner("🔍 Checking availability..."):
+
+            future = st.session_state.get('availability_future')
+            if future is None or st.session_state.get('availability_future_key') != cache_key:
+                # Debounce: Streamlit reruns on every interaction, so a
+                # user flicking through dates would fire one backend call
+                # per step. Coalesce bursts by waiting out a short window
+                # before dispatching for a new combination.
+                now = time.monotonic()
+                if now - st.session_state.get('last_fetch_ts', 0.0) < 0.5:
+                    time.sleep(0.2)
+                    st.rerun()
+                st.session_state.last_fetch_ts = now
+                future = get_executor().submit(fetch_availability, selected_doctor, selected_date, 1234567)
+                st.session_state.availability_future = future
+                st.session_state.availability_future_key = cache_key
+
+            if not future.done():
+                # Poll on the next rerun instead of blocking this one
+                st.caption("🔍 Checking availability...")
+                time.sleep(0.3)
+                st.rerun()
+            else:
+                st.session_state.availability_future = None
                 try:
-                    # Simple tool call for availability
-                    request_data = {
-                        'messages': f"Check availability for Dr. {selected_doctor.replace('_', ' ').title()} on {selected_date}", 
-                        'id_number': 1234567
-                    }
-                    
-                    response = requests.post(API_URL, json=request_data, verify=False)
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        # Extract available slots from AI response
-                        available_slots = []
-                        for msg in result.get('messages', []):
-                            if msg.get('type') == 'ai':
-                                content = msg.get('content', '')
-                                if 'Available slots:' in content:
-                                    # Parse the slots from the response
-                                    slots_text = content.split("Available slots:")[1].strip()
-                                    # Split by comma and clean up each slot
-                                    available_slots = [slot.strip() for slot in slots_text.split(',') if slot.strip()]
-                                    break
-                                elif 'Available Time Slots:' in content:
-                                    # Parse the formatted response
-                                    lines = content.split('\n')
-                                    for line in lines:
-                                        if line.strip() and line.strip()[0].isdigit():
-                                            # Extract time slot from lines like "1. 08:00"
-                                            time_part = line.split('.', 1)[1].strip()
-                                            available_slots.append(time_part)
-                                    break
-                        
-                        st.session_state.available_slots = available_slots
-                        st.session_state.last_availability_check = cache_key
-                        if available_slots:
-                            st.success(f"Found {len(available_slots)} available slots!")
-                        else:
-                            st.warning("No available slots found")
-                            # Debug: show the raw response
-                            st.text(f"Debug - Raw response: {result.get('messages', [{}])[0].get('content', 'No content')[:200]}...")
+                    available_slots = future.result()
+                    st.session_state.available_slots = available_slots
+                    st.session_state.last_availability_check = cache_key
+                    if available_slots:
+                        st.success(f"Found {len(available_slots)} available slots!")
                     else:
-                        st.error(f"Error checking availability: {response.status_code}")
+                        st.warning("No available slots found")
                 except Exception as e:
                     st.error(f"Error: {e}")
     
@@ -237,15 +423,15 @@ with st.sidebar:
                                 'id_number': int(user_id) if user_id else 1234567
                             }
                             
-                            response = requests.post(API_URL, json=request_data, verify=False)
+                            response = _post_json(request_data)
                             
                             if response.status_code == 200:
-                                result = response.json()
+                                result = _json_loads(response.content)
                                 st.session_state.session_id = result.get('session_id')
-                                
-                                # Replace conversation history with full history from backend
-                                st.session_state.conversation_history = result.get('messages', [])
-                                
+
+                                # Backend returns only this turn's delta
+                                st.session_state.conversation_history.extend(result.get('new_messages', []))
+
                                 st.success("✅ Appointment booked successfully!")
                                 st.rerun()
                             else:
@@ -276,50 +462,52 @@ with tab1:
             st.write(f"{i}. {slot}")
         st.write("**You can say:** 'Book slot 1' or 'I want 08:00'")
     
-    # Display conversation history after availability slots
+    # Display conversation history after availability slots.
+    # Rendered HTML is cached incrementally in session state: each rerun
+    # formats only the newly-arrived suffix and emits one st.markdown for
+    # the whole transcript instead of one call per message.
     if st.session_state.conversation_history:
         st.subheader("Conversation History")
-        
+
         # Create a scrollable container for the conversation
         conversation_container = st.container()
-        
+
         with conversation_container:
-            for i, msg in enumerate(st.session_state.conversation_history):
+            history = st.session_state.conversation_history
+            rendered_len = st.session_state.get('rendered_len', 0)
+            if rendered_len > len(history):
+                # History was cleared or replaced with something shorter
+                rendered_len = 0
+                st.session_state.rendered_html = ""
+
+            new_parts = []
+            for msg in history[rendered_len:]:
                 # Skip system messages and focus on user/assistant messages
                 if msg.get('type') == 'human' and not msg.get('content', '').startswith('User ID:'):
                     # Extract just the user query from the message
                     user_content = msg.get('content', '')
-                    
+
                     # User message - right aligned
-                    st.markdown(f"""
+                    new_parts.append(f"""
                     <div style="background-color: #e3f2fd; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #2196F3; margin-left: 20%;">
                         <strong>You:</strong> {user_content}
                     </div>
-                    """, unsafe_allow_html=True)
-                    
+                    """)
+
                 elif msg.get('type') == 'ai':
                     # AI response
-                    content = msg.get('content', '')
-                    
-                    # Handle different content formats
-                    if isinstance(content, list):
-                        # Extract text from structured content
-                        text_content = ""
-                        for item in content:
-                            if isinstance(item, dict) and item.get('type') == 'text':
-                                text_content += item.get('text', '')
-                            elif isinstance(item, str):
-                                text_content += item
-                        content = text_content if text_content else str(content)
-                    else:
-                        content = str(content)
-                    
+                    content = _normalize_content(msg.get('content', ''))
+
                     # AI message - left aligned
-                    st.markdown(f"""
+                    new_parts.append(f"""
                     <div style="background-color: #f3e5f5; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #9c27b0; margin-right: 20%;">
                         <strong>Assistant:</strong> {content}
                     </div>
-                    """, unsafe_allow_html=True)
+                    """)
+
+            st.session_state.rendered_html = st.session_state.get('rendered_html', "") + ''.join(new_parts)
+            st.session_state.rendered_len = len(history)
+            st.markdown(st.session_state.rendered_html, unsafe_allow_html=True)
     
     # Handle redirected messages from My Appointments tab
     if st.session_state.get('redirect_message'):
@@ -337,15 +525,15 @@ with tab1:
                     if st.session_state.session_id:
                         request_data['session_id'] = st.session_state.session_id
                     
-                    response = requests.post(API_URL, json=request_data, verify=False)
+                    response = _post_json(request_data)
                     
                     if response.status_code == 200:
-                        result = response.json()
+                        result = _json_loads(response.content)
                         st.session_state.session_id = result.get('session_id')
-                        
-                        # Replace conversation history with full history from backend
-                        st.session_state.conversation_history = result.get('messages', [])
-                        
+
+                        # Backend returns only this turn's delta
+                        st.session_state.conversation_history.extend(result.get('new_messages', []))
+
                         st.success("Request processed!")
                         
                         # Check if this was a cancellation or reschedule
@@ -388,26 +576,38 @@ with tab1:
                             context_message = f"Doctor: {selected_doctor_display}, Date: {selected_date}. {query}"
                         
                         request_data = {
-                            'messages': context_message, 
+                            'messages': context_message,
                             'id_number': int(user_id)
                         }
                         if st.session_state.session_id:
                             request_data['session_id'] = st.session_state.session_id
-                        
-                        response = requests.post(API_URL, json=request_data, verify=False)
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            st.session_state.session_id = result.get('session_id')
-                            
-                            # Replace conversation history with full history from backend
-                            # (Backend now returns full conversation history)
-                            st.session_state.conversation_history = result.get('messages', [])
-                            
-                            st.success("Response received!")
-                            st.rerun()
-                        else:
-                            st.error(f"Error {response.status_code}: {response.text}")
+
+                        # Stream this turn's delta line by line so the
+                        # newest assistant message shows up immediately
+                        with get_session().post(STREAM_URL, json=request_data, verify=False,
+                                                timeout=30, stream=True) as response:
+                            if response.status_code == 200:
+                                placeholder = st.empty()
+                                new_history = []
+                                for line in response.iter_lines():
+                                    if not line:
+                                        continue
+                                    payload = _json_loads(line)
+                                    st.session_state.session_id = payload.get('session_id')
+                                    msg = payload.get('message')
+                                    if msg:
+                                        new_history.append(msg)
+                                        if msg.get('type') == 'ai':
+                                            placeholder.markdown(msg.get('content', ''))
+
+                                # The stream carries only this turn's
+                                # delta; append it to the local history
+                                st.session_state.conversation_history.extend(new_history)
+
+                                st.success("Response received!")
+                                st.rerun()
+                            else:
+                                st.error(f"Error {response.status_code}: {response.text}")
                     except Exception as e:
                         st.error(f"Exception occurred: {e}")
             else:
@@ -435,50 +635,24 @@ with tab2:
         if cancel_user_id:
             with st.spinner("Checking your appointments..."):
                 try:
-                    request_data = {
-                        'messages': 'show my appointments', 
-                        'id_number': int(cancel_user_id)
-                    }
-                    if st.session_state.session_id:
-                        request_data['session_id'] = st.session_state.session_id
-                    
-                    response = requests.post(API_URL, json=request_data, verify=False)
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        st.session_state.session_id = result.get('session_id')
-                        # Store appointments data separately for this page
-                        st.session_state.my_appointments_data = result.get('messages', [])
-                        st.session_state.current_patient_id = int(cancel_user_id)
-                        st.success("Appointments retrieved!")
-                        st.rerun()
-                    else:
-                        st.error(f"Error {response.status_code}: {response.text}")
+                    # Served from the 30s st.cache_data entry when the user
+                    # just checked; only cache misses hit the backend
+                    st.session_state.my_appointments_data = fetch_appointments(int(cancel_user_id))
+                    st.session_state.current_patient_id = int(cancel_user_id)
+                    st.success("Appointments retrieved!")
+                    st.rerun()
                 except Exception as e:
                     st.error(f"Exception occurred: {e}")
         else:
             st.warning("Please enter your ID number.")
     
     # Display appointments directly on this page
-    if hasattr(st.session_state, 'my_appointments_data') and st.session_state.my_appointments_data:
+    if st.session_state.my_appointments_data:
         st.subheader("Your Appointments")
         
         for i, msg in enumerate(st.session_state.my_appointments_data):
-            content = msg.get('content', '')
-            
-            # Handle different content formats
-            if isinstance(content, list):
-                # Extract text from structured content
-                text_content = ""
-                for item in content:
-                    if isinstance(item, dict) and item.get('type') == 'text':
-                        text_content += item.get('text', '')
-                    elif isinstance(item, str):
-                        text_content += item
-                content_str = text_content if text_content else str(content)
-            else:
-                content_str = str(content)
-            
+            content_str = _normalize_content(msg.get('content', ''))
+
             # Check if this message contains appointment data (AI message with appointment history)
             if (msg.get('type') == 'ai' and 'Appointment History for User' in content_str) or (msg.get('type') == 'tool' and 'get_user_appointments' in msg.get('name', '')):
                 # This is the raw appointment data from the tool
@@ -488,172 +662,83 @@ with tab2:
                 if "Appointments for User" in appointment_data or "Appointment History for User" in appointment_data:
                     # Check if this is history or current appointments
                     if "Appointment History for User" in appointment_data:
-                        st.markdown("""
-                        <div style="background-color: #e8f5e8; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #4caf50;">
-                            <strong>Your Complete Appointment History:</strong><br><br>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        heading = "Your Complete Appointment History:"
                     else:
-                        st.markdown("""
-                        <div style="background-color: #e8f5e8; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #4caf50;">
-                            <strong>Your Current Appointments:</strong><br><br>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Extract appointment lines and format them nicely
-                    lines = appointment_data.split('\n')
-                    current_appointment = []
-                    appointment_counter = 0  # Initialize counter for unique keys
-                    raw_appointments = []  # Store raw appointment data for cancellation
-                    
-                    for line in lines:
-                        if line.strip() and not line.startswith(('Appointments for User', 'Appointment History for User', 'Summary:')):
-                            if line.strip().startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.')):
-                                # This is an appointment line - display previous appointment if exists
-                                if current_appointment:
-                                    appointment_content = ''.join(current_appointment)
-                                    appointment_counter += 1  # Increment counter for each appointment
-                                    appointment_num = appointment_counter
-                                    
-                                    # Determine appointment status and color
-                                    status = "ACTIVE"
-                                    border_color = "#2196f3"
-                                    bg_color = "#f9f9f9"
-                                    
-                                    if "❌" in appointment_content:
-                                        status = "CANCELLED"
-                                        border_color = "#f44336"
-                                        bg_color = "#ffebee"
-                                    elif "✅" in appointment_content:
-                                        status = "COMPLETED"
-                                        border_color = "#4caf50"
-                                        bg_color = "#e8f5e8"
-                                    elif "🟢" in appointment_content:
-                                        status = "UPCOMING"
-                                        border_color = "#2196f3"
-                                        bg_color = "#f9f9f9"
-                                    
-                                    st.markdown(f"""
-                                    <div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid {border_color}; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                                        {appointment_content}
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    # Add action buttons only for upcoming appointments
-                                    if status == "UPCOMING":
-                                        col1, col2 = st.columns(2)
-                                        with col1:
-                                            if st.button("❌ Cancel", key=f"cancel_{appointment_num}", type="secondary"):
-                                                # Extract appointment details for direct cancellation
-                                                appointment_details = _extract_appointment_details(appointment_content)
-                                                
-                                                # Directly call cancellation API
-                                                _handle_direct_cancellation(appointment_num, appointment_details, cancel_user_id)
-                                                
-                                                # Refresh appointments
-                                                st.rerun()
-                                        
-                                        with col2:
-                                            if st.button("Reschedule", key=f"reschedule_{appointment_num}", type="secondary"):
-                                                # Preserve conversation history and redirect to Book Appointment tab
-                                                if hasattr(st.session_state, 'my_appointments_data'):
-                                                    # Merge appointment data with existing conversation history
-                                                    if hasattr(st.session_state, 'conversation_history'):
-                                                        st.session_state.conversation_history.extend(st.session_state.my_appointments_data)
-                                                    else:
-                                                        st.session_state.conversation_history = st.session_state.my_appointments_data
-                                                
-                                                st.session_state.active_tab = 0
-                                                st.session_state.redirect_message = f"reschedule my appointment number {appointment_num}"
-                                                st.rerun()
-                                    
-                                    current_appointment = []
-                                
-                                # Start new appointment
-                                current_appointment.append(f"<strong>{line.strip()}</strong><br>")
-                            elif (line.strip().startswith('   ') or 
-                                  line.strip().startswith('Date & Time:') or 
-                                  line.strip().startswith('Specialization:') or
-                                  'Date & Time:' in line or
-                                  'Specialization:' in line):
-                                # This is appointment details (with spaces or emoji prefixes)
-                                clean_line = line.strip()
-                                if 'Date & Time:' in clean_line:
-                                    current_appointment.append(f"<span style='color: #1976d2; font-weight: bold;'>{clean_line}</span><br>")
-                                elif 'Specialization:' in clean_line:
-                                    current_appointment.append(f"<span style='color: #388e3c;'>{clean_line}</span><br>")
-                                else:
-                                    current_appointment.append(f"{clean_line}<br>")
-                    
-                    # Display the last appointment if exists
-                    if current_appointment:
-                        appointment_content = ''.join(current_appointment)
-                        appointment_counter += 1  # Increment counter for the last appointment
+                        heading = "Your Current Appointments:"
+
+                    # Single regex pass over the listing: one C-level
+                    # scan replaces the per-line startswith state machine
+                    # and the separate detail-extraction regexes. The
+                    # heading and the HTML for all appointments go out as
+                    # one st.markdown blob — a single frontend websocket
+                    # message and one browser layout pass, instead of one
+                    # round-trip per appointment.
+                    appointment_counter = 0
+                    html_parts = [
+                        f'<div style="background-color: #e8f5e8; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #4caf50;">'
+                        f'<strong>{heading}</strong><br><br></div>'
+                    ]
+                    upcoming = []
+                    for block in _APPT_BLOCK_RE.finditer(appointment_data):
+                        ref, marker, doctor, date_time, spec, status_text = (
+                            (g or '').strip() for g in block.groups())
+                        appointment_counter += 1
                         appointment_num = appointment_counter
-                        
-                        # Determine appointment status and color for last appointment
-                        status = "ACTIVE"
-                        border_color = "#2196f3"
-                        bg_color = "#f9f9f9"
-                        
-                        if "❌" in appointment_content:
-                            status = "CANCELLED"
-                            border_color = "#f44336"
-                            bg_color = "#ffebee"
-                        elif "✅" in appointment_content:
-                            status = "COMPLETED"
-                            border_color = "#4caf50"
-                            bg_color = "#e8f5e8"
-                        elif "🟢" in appointment_content:
-                            status = "UPCOMING"
-                            border_color = "#2196f3"
-                            bg_color = "#f9f9f9"
-                        
-                        st.markdown(f"""
-                        <div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid {border_color}; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                            {appointment_content}
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Add action buttons only for upcoming appointments
+
+                        # Determine appointment status and color from the
+                        # captured marker
+                        status, border_color, bg_color = _STATUS_STYLES.get(marker, _DEFAULT_STYLE)
+
+                        html_parts.append(_APPT_CARD_TMPL.format(
+                            bg_color=bg_color, border_color=border_color,
+                            ref=ref, marker=marker, doctor=doctor,
+                            date_time=date_time, spec=spec,
+                            status_text=status_text))
+
                         if status == "UPCOMING":
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                if st.button("❌ Cancel", key=f"cancel_last_{appointment_num}", type="secondary"):
-                                    # Extract appointment details for direct cancellation
-                                    appointment_details = _extract_appointment_details(appointment_content)
-                                    
-                                    # Directly call cancellation API
-                                    _handle_direct_cancellation(appointment_num, appointment_details, cancel_user_id)
-                                    
-                                    # Refresh appointments
-                                    st.rerun()
-                            
-                            with col2:
-                                if st.button("Reschedule", key=f"reschedule_last_{appointment_num}", type="secondary"):
-                                    # Preserve conversation history and redirect to Book Appointment tab
-                                    if hasattr(st.session_state, 'my_appointments_data'):
-                                        # Merge appointment data with existing conversation history
-                                        if hasattr(st.session_state, 'conversation_history'):
-                                            st.session_state.conversation_history.extend(st.session_state.my_appointments_data)
-                                        else:
-                                            st.session_state.conversation_history = st.session_state.my_appointments_data
-                                    
-                                    st.session_state.active_tab = 0
-                                    st.session_state.redirect_message = f"reschedule my appointment number {appointment_num}"
-                                    st.rerun()
-                    
-                    # Display summary if available
-                    summary_lines = [line for line in lines if line.strip().startswith('Summary:') or line.strip().startswith('   ✓') or line.strip().startswith('   ✗')]
-                    if summary_lines:
-                        
-                        summary_content = ""
-                        for line in summary_lines:
-                            if line.strip().startswith('Summary:'):
-                                continue  # Skip the header
-                            clean_line = line.strip()
-                            summary_content += f"{clean_line}<br>"
-                        
+                            upcoming.append((appointment_num, doctor, date_time, spec))
+
+                    st.markdown(''.join(html_parts), unsafe_allow_html=True)
+
+                    # Action buttons in a second pass, only for the
+                    # upcoming appointments that actually need them
+                    for appointment_num, doctor, date_time, spec in upcoming:
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            if st.button(f"❌ Cancel #{appointment_num}", key=f"cancel_{appointment_num}", type="secondary"):
+                                # Captured groups already hold the
+                                # details; no re-extraction needed
+                                appointment_details = {
+                                    'doctor': doctor,
+                                    'date_time': date_time,
+                                    'specialization': spec
+                                }
+
+                                # Directly call cancellation API
+                                _handle_direct_cancellation(appointment_num, appointment_details, cancel_user_id)
+
+                                # Refresh appointments
+                                st.rerun()
+
+                        with col2:
+                            if st.button(f"Reschedule #{appointment_num}", key=f"reschedule_{appointment_num}", type="secondary"):
+                                # Preserve conversation history and redirect
+                                # to the Book Appointment tab; both keys are
+                                # initialized up top, so plain attribute
+                                # access replaces the hasattr probes
+                                st.session_state.conversation_history.extend(st.session_state.my_appointments_data)
+
+                                st.session_state.active_tab = 0
+                                st.session_state.redirect_message = f"reschedule my appointment number {appointment_num}"
+                                st.rerun()
+
+                    # Display summary if available: one multiline regex
+                    # pass over the listing, no per-line startswith chain
+                    summary_content = ''.join(
+                        f"{line.rstrip()}<br>"
+                        for line in _SUMMARY_LINE_RE.findall(appointment_data)
+                    )
+                    if summary_content:
                         st.markdown(f"""
                         <div style="background-color: #fafafa; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #9c27b0;">
                             {summary_content}
@@ -661,15 +746,11 @@ with tab2:
                         """, unsafe_allow_html=True)
             
             elif msg.get('type') == 'ai' and 'appointments' in content_str.lower() and 'Here are all your current appointments' in content_str:
-                # This is the formatted response from the AI
-                st.markdown("""
+                # Heading and body in one st.markdown message
+                st.markdown(f"""
                 <div style="background-color: #fff3e0; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #ff9800;">
                     <strong>Assistant Response:</strong><br><br>
                 </div>
-                """, unsafe_allow_html=True)
-                
-                # Display the AI's formatted response
-                st.markdown(f"""
                 <div style="background-color: #f3e5f5; padding: 15px; border-radius: 15px; margin: 10px 0; border-left: 4px solid #9c27b0;">
                     {content_str}
                 </div>
@@ -1,22 +1,269 @@
+import functools
+import json
+import os
+import threading
+
+import numpy as np
 import pandas as pd
-from typing import  Literal
+
+# Optional: a Parquet mirror of the availability table loads much faster
+# than re-parsing CSV text (columnar, typed, dictionary-encoded strings)
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+from dataclasses import dataclass
+from typing import  Literal, Optional
 from langchain_core.tools import tool
 from data_models.models import *
 
 
+@dataclass
+class ToolResult:
+    """Structured outcome of a mutating tool call.
+
+    Callers branch on `ok` instead of scanning the reply text for phrases
+    like "Successfully done".
+    """
+    ok: bool
+    message: str
+    data: Optional[dict] = None
+
+
+def as_tool_result(result) -> ToolResult:
+    """Backward-compat shim: wrap legacy string returns in a ToolResult."""
+    if isinstance(result, ToolResult):
+        return result
+    return ToolResult(ok=str(result).startswith("Successfully"), message=str(result))
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_display_name(name: str) -> str:
+    """Human-readable form of an underscored CSV name, memoized.
+
+    Only ~10 doctors and a handful of specializations exist, so repeated
+    rows become dict lookups instead of replace/title calls.
+    """
+    return name.replace('_', ' ').title()
+
+
+# Status labels -> display emoji for the appointment listing
+_STATUS_EMOJI = {
+    "UPCOMING": "🟢",
+    "COMPLETED": "✅",
+    "CANCELLED": "❌",
+    "ACTIVE": "🟢"
+}
+
+_CSV_PATH = "data/doctor_availability.csv"
+_PARQUET_PATH = "data/doctor_availability.parquet"
+# Write-ahead log of single-slot changes: bookings append one record here
+# (O(1) disk write) instead of rewriting the whole CSV, and the log is
+# folded back into the CSV once it grows past the threshold
+_WAL_PATH = "data/doctor_availability.log"
+_WAL_COMPACT_THRESHOLD = 256
+
+# Parsed availability table, reused until the file on disk changes.
+# Re-reading and re-parsing the CSV on every tool call is pure wasted I/O;
+# the mtime check keeps the cache honest across out-of-band edits.
+_CACHE = {"mtime": None, "df": None, "idx": None, "cols": None, "wal_len": 0}
+_CACHE_LOCK = threading.Lock()
+
+
+def _load_df() -> pd.DataFrame:
+    """The availability table, cached until the CSV's mtime changes.
+
+    Returns a shallow copy so callers can add derived columns without
+    touching the cached frame.
+    """
+    mtime = _store_mtime()
+    with _CACHE_LOCK:
+        if _CACHE["mtime"] != mtime:
+            _refresh_cache(_read_table(), mtime)
+        return _CACHE["df"].copy(deep=False)
+
+
+def _store_mtime() -> int:
+    """Cache key covering both the CSV and any pending log records."""
+    mtime = os.stat(_CSV_PATH).st_mtime_ns
+    try:
+        mtime = max(mtime, os.stat(_WAL_PATH).st_mtime_ns)
+    except OSError:
+        pass
+    return mtime
+
+
+def _refresh_cache(df: pd.DataFrame, mtime: int) -> None:
+    """Install a freshly loaded frame plus its row/column indexes.
+
+    Must be called with _CACHE_LOCK held. The (date_slot, doctor_name)
+    dict turns the slot lookups in the mutating tools into O(1) access
+    instead of repeated full-frame boolean masks.
+    """
+    _CACHE["df"] = df
+    _CACHE["idx"] = {key: i for i, key in enumerate(zip(df['date_slot'], df['doctor_name']))}
+    _CACHE["cols"] = {col: i for i, col in enumerate(df.columns)}
+    _CACHE["mtime"] = mtime
+
+
+def _read_table() -> pd.DataFrame:
+    """Load the availability table, preferring the Parquet mirror.
+
+    The CSV stays the canonical store (the UI and MCP layer read it
+    directly), but when pyarrow is installed a Parquet mirror is kept
+    next to it and loaded instead whenever it is at least as fresh —
+    a typed columnar read instead of a full text parse.
+    """
+    df = None
+    if PARQUET_AVAILABLE:
+        try:
+            if os.stat(_PARQUET_PATH).st_mtime_ns >= os.stat(_CSV_PATH).st_mtime_ns:
+                df = pd.read_parquet(_PARQUET_PATH)
+        except OSError:
+            pass
+    if df is None:
+        df = _read_csv()
+        _write_mirror(df)
+    # Split date_slot once at load time: vector comparisons on these
+    # columns replace the per-row .apply splits in every availability
+    # check, and categorical doctor names make the equality filter an
+    # integer compare instead of a string compare per row
+    df[['slot_date', 'slot_time']] = df['date_slot'].str.split(' ', n=1, expand=True)
+    _CACHE["wal_len"] = _apply_wal(df)
+    return df
+
+
+def _apply_wal(df: pd.DataFrame) -> int:
+    """Replay pending log records onto a freshly loaded frame."""
+    try:
+        with open(_WAL_PATH) as fh:
+            records = [json.loads(line) for line in fh if line.strip()]
+    except OSError:
+        return 0
+    if records:
+        pos = {key: i for i, key in enumerate(zip(df['date_slot'], df['doctor_name']))}
+        avail_col = df.columns.get_loc('is_available')
+        patient_col = df.columns.get_loc('patient_to_attend')
+        for rec in records:
+            row = pos.get((rec['date_slot'], rec['doctor_name']))
+            if row is not None:
+                df.iat[row, avail_col] = rec['is_available']
+                df.iat[row, patient_col] = rec['patient_to_attend']
+    return len(records)
+
+
+_STORE_COLUMNS = ['date_slot', 'specialization', 'doctor_name',
+                  'is_available', 'patient_to_attend']
+
+
+def _read_csv() -> pd.DataFrame:
+    """Parse the canonical CSV, preferring pyarrow's reader.
+
+    Arrow's CSV parser is multithreaded and SIMD-accelerated, and its
+    bool/numeric columns convert to pandas zero-copy; the dictionary-
+    encoded name columns come across as categories. Explicit columns and
+    dtypes skip whole-file type inference on either path.
+    """
+    if PARQUET_AVAILABLE:
+        name_type = pa.dictionary(pa.int32(), pa.string())
+        table = pa_csv.read_csv(
+            _CSV_PATH,
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=_STORE_COLUMNS,
+                column_types={'doctor_name': name_type,
+                              'specialization': name_type,
+                              'is_available': pa.bool_()}),
+        )
+        return table.to_pandas()
+    return pd.read_csv(
+        _CSV_PATH,
+        usecols=_STORE_COLUMNS,
+        dtype={'doctor_name': 'category', 'specialization': 'category',
+               'is_available': 'bool'},
+    )
+
+
+def _write_mirror(df: pd.DataFrame) -> None:
+    """Refresh the Parquet mirror; dictionary-encodes the string columns."""
+    if not PARQUET_AVAILABLE:
+        return
+    mirror = df.drop(columns=['slot_date', 'slot_time'], errors='ignore')
+    mirror['doctor_name'] = mirror['doctor_name'].astype('category')
+    mirror['specialization'] = mirror['specialization'].astype('category')
+    try:
+        mirror.to_parquet(_PARQUET_PATH)
+    except OSError:
+        pass
+
+
+def _save_df(df: pd.DataFrame) -> None:
+    """Rewrite the full table and clear the log (compaction path).
+
+    Per-booking writes go through _commit_update instead; this runs only
+    when the log needs folding back into the CSV. The load-time
+    slot_date/slot_time columns are derived, so they are left out of the
+    canonical CSV.
+    """
+    df.drop(columns=['slot_date', 'slot_time'], errors='ignore').to_csv(_CSV_PATH, index=False)
+    _write_mirror(df)
+    # Every logged change is now folded into the CSV
+    try:
+        os.remove(_WAL_PATH)
+    except OSError:
+        pass
+    with _CACHE_LOCK:
+        _CACHE["wal_len"] = 0
+        _refresh_cache(df, _store_mtime())
+
+
+def _commit_update(df: pd.DataFrame, date_slot: str, doctor_name: str,
+                   is_available: bool, patient) -> None:
+    """Persist a single slot change via the write-ahead log.
+
+    Appending one record is O(1) disk I/O per booking, against the O(N)
+    full-file rewrite df.to_csv used to do. The caller has already
+    mutated the frame in place, so the cache just keeps it.
+    """
+    record = {"date_slot": date_slot, "doctor_name": doctor_name,
+              "is_available": is_available, "patient_to_attend": patient}
+    with _CACHE_LOCK:
+        with open(_WAL_PATH, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+        _CACHE["wal_len"] += 1
+        wal_len = _CACHE["wal_len"]
+        _CACHE["df"] = df
+        _CACHE["mtime"] = _store_mtime()
+    if wal_len >= _WAL_COMPACT_THRESHOLD:
+        _save_df(df)
+
+
+def _row_lookup():
+    """The cached (date_slot, doctor_name) -> row and column indexes.
+
+    Callers load the frame via _load_df() first, so the cache is warm and
+    row positions match the returned copy.
+    """
+    with _CACHE_LOCK:
+        return _CACHE["idx"], _CACHE["cols"]
+
+
 @tool
 def check_availability_by_doctor(desired_date:DateModel, doctor_name:Literal['kevin anderson','robert martinez','susan davis','daniel miller','sarah wilson','michael green','lisa brown','jane smith','emily johnson','john doe']):
     """
     Checking the database if we have availability for the specific doctor.
     The parameters should be mentioned by the user in the query
     """
-    df = pd.read_csv(r"data/doctor_availability.csv")
-    
-    #print(df)
-    
-    df['date_slot_time'] = df['date_slot'].apply(lambda input: input.split(' ')[-1])
-    
-    rows = list(df[(df['date_slot'].apply(lambda input: input.split(' ')[0]) == desired_date.date)&(df['doctor_name'] == doctor_name)&(df['is_available'] == True)]['date_slot_time'])
+    df = _load_df()
+
+    # One fused query over the precomputed slot columns instead of three
+    # chained boolean masks with intermediate allocations; pandas runs it
+    # through numexpr where the dtypes allow
+    date = desired_date.date
+    rows = df.query(
+        "slot_date == @date and doctor_name == @doctor_name and is_available"
+    )['slot_time'].tolist()
 
     if len(rows) == 0:
         output = "No availability in the entire day"
@@ -31,40 +278,42 @@ def set_appointment(desired_date:DateTimeModel, id_number:IdentificationNumberMo
     Set appointment or slot with the doctor.
     The parameters MUST be mentioned by the user in the query.
     """
-    df = pd.read_csv(r"data/doctor_availability.csv")
-   
-    from datetime import datetime
-    def convert_datetime_format(dt_str):
-        # Parse the input datetime string
-        #dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
-        dt = datetime.strptime(dt_str, "%d-%m-%Y %H:%M")
-        
-        # Format the output as 'DD-MM-YYYY HH:MM' (keep colon format to match CSV)
-        return dt.strftime("%d-%m-%Y %H:%M")
-    
-    case = df[(df['date_slot'] == convert_datetime_format(desired_date.date))&(df['doctor_name'] == doctor_name)&(df['is_available'] == True)]
-    if len(case) == 0:
-        return "No available appointments for that particular case"
+    df = _load_df()
+
+    # DateTimeModel already validates the 'DD-MM-YYYY HH:MM' shape, which
+    # is exactly the CSV slot format, so the old strptime/strftime
+    # round-trip was a no-op and the string is used as-is
+    # O(1) dict lookup instead of two full-frame boolean-mask scans
+    idx, cols = _row_lookup()
+    row = idx.get((desired_date.date, doctor_name))
+    avail_col, patient_col = cols['is_available'], cols['patient_to_attend']
+    if row is None or not df.iat[row, avail_col]:
+        return ToolResult(ok=False, message="No available appointments for that particular case")
     else:
-        df.loc[(df['date_slot'] == convert_datetime_format(desired_date.date))&(df['doctor_name'] == doctor_name) & (df['is_available'] == True), ['is_available','patient_to_attend']] = [False, id_number.id]
-        df.to_csv(r'data/doctor_availability.csv', index = False)
+        df.iat[row, avail_col] = False
+        df.iat[row, patient_col] = id_number.id
+        _commit_update(df, desired_date.date, doctor_name, False, id_number.id)
 
-        return "Successfully done"
+        return ToolResult(ok=True, message="Successfully done")
 @tool
 def cancel_appointment(date:DateTimeModel, id_number:IdentificationNumberModel, doctor_name:Literal['kevin anderson','robert martinez','susan davis','daniel miller','sarah wilson','michael green','lisa brown','jane smith','emily johnson','john doe']):
     """
     Canceling an appointment.
     The parameters MUST be mentioned by the user in the query.
     """
-    df = pd.read_csv(r"data/doctor_availability.csv")
-    case_to_remove = df[(df['date_slot'] == date.date)&(df['patient_to_attend'] == id_number.id)&(df['doctor_name'] == doctor_name)]
-    if len(case_to_remove) == 0:
-        return "You don´t have any appointment with that specifications"
+    df = _load_df()
+    # O(1) dict lookup instead of two full-frame boolean-mask scans
+    idx, cols = _row_lookup()
+    row = idx.get((date.date, doctor_name))
+    avail_col, patient_col = cols['is_available'], cols['patient_to_attend']
+    if row is None or df.iat[row, patient_col] != id_number.id:
+        return ToolResult(ok=False, message="You don´t have any appointment with that specifications")
     else:
-        df.loc[(df['date_slot'] == date.date) & (df['patient_to_attend'] == id_number.id) & (df['doctor_name'] == doctor_name), ['is_available', 'patient_to_attend']] = [True, None]
-        df.to_csv(r'data/doctor_availability.csv', index = False)
+        df.iat[row, avail_col] = True
+        df.iat[row, patient_col] = None
+        _commit_update(df, date.date, doctor_name, True, None)
 
-        return "Successfully cancelled"
+        return ToolResult(ok=True, message="Successfully cancelled")
 
 
 @tool
@@ -75,7 +324,7 @@ def get_user_appointments(id_number: IdentificationNumberModel) -> str:
         id_number: Patient identification number
     """
     try:
-        df = pd.read_csv("data/doctor_availability.csv")
+        df = _load_df()
         
         # Find all appointments for this user (both active and cancelled)
         appointments = df[df['patient_to_attend'] == id_number.id]
@@ -83,98 +332,48 @@ def get_user_appointments(id_number: IdentificationNumberModel) -> str:
         if appointments.empty:
             return f"No appointments found for user {id_number.id}"
         
-        def format_datetime(datetime_str):
-            """Format datetime string to be more readable"""
-            try:
-                from datetime import datetime
-                # Parse the datetime string (format: DD-MM-YYYY HH:MM)
-                dt = datetime.strptime(datetime_str, "%d-%m-%Y %H:%M")
-                
-                # Format date
-                date_formatted = dt.strftime("%A, %B %d, %Y")
-                
-                # Format time in 12-hour format
-                time_formatted = dt.strftime("%I:%M %p")
-                
-                return f"{date_formatted} at {time_formatted}"
-            except:
-                return datetime_str  # Return original if parsing fails
-        
-        def format_doctor_name(name):
-            """Format doctor name to be more readable"""
-            return name.replace('_', ' ').title()
-        
-        def format_specialization(spec):
-            """Format specialization to be more readable"""
-            return spec.replace('_', ' ').title()
-        
-        def get_appointment_status(row):
-            """Determine appointment status based on availability and date"""
-            from datetime import datetime
-            
-            try:
-                # Parse appointment date
-                appointment_date = datetime.strptime(row['date_slot'], "%d-%m-%Y %H:%M")
-                current_date = datetime.now()
-                
-                if row['is_available'] == True:
-                    return "CANCELLED"
-                elif appointment_date < current_date:
-                    return "COMPLETED"
-                else:
-                    return "UPCOMING"
-            except:
-                return "ACTIVE" if row['is_available'] == False else "CANCELLED"
-        
-        def get_status_emoji(status):
-            """Get emoji for appointment status"""
-            status_emojis = {
-                "UPCOMING": "🟢",
-                "COMPLETED": "✅", 
-                "CANCELLED": "❌",
-                "ACTIVE": "🟢"
-            }
-            return status_emojis.get(status, "📋")
-        
         # Sort appointments by date (newest first)
         appointments = appointments.sort_values('date_slot', ascending=False)
-        
-        result = f"📋 Appointment History for User {id_number.id}:\n\n"
-        
-        # Group appointments by status
-        upcoming_count = 0
-        completed_count = 0
-        cancelled_count = 0
-        
-        for i, (_, row) in enumerate(appointments.iterrows()):
+
+        # One C-level parse plus vectorized formatting for the whole
+        # listing, instead of a Series allocation and strptime per row.
+        # Rows that fail to parse fall back to the raw slot string.
+        dt = pd.to_datetime(appointments['date_slot'], format='%d-%m-%Y %H:%M', errors='coerce', cache=True)
+        parsed = dt.notna()
+        date_times = np.where(
+            parsed,
+            dt.dt.strftime('%A, %B %d, %Y at %I:%M %p'),
+            appointments['date_slot'])
+        cancelled = appointments['is_available'].astype(bool)
+        statuses = np.where(
+            cancelled, 'CANCELLED',
+            np.where(dt < pd.Timestamp.now(), 'COMPLETED', 'UPCOMING'))
+        # Unparseable non-cancelled rows keep the legacy ACTIVE label
+        statuses = np.where(~parsed & ~cancelled, 'ACTIVE', statuses)
+
+        parts = [f"📋 Appointment History for User {id_number.id}:\n\n"]
+
+        rows = zip(appointments['doctor_name'], appointments['specialization'],
+                   date_times, statuses)
+        for i, (doctor, spec, date_time, status) in enumerate(rows):
             # Convert index to letter (0=a, 1=b, 2=c, etc.)
             appointment_letter = chr(ord('a') + i)
-            formatted_datetime = format_datetime(row['date_slot'])
-            formatted_doctor = format_doctor_name(row['doctor_name'])
-            formatted_spec = format_specialization(row['specialization'])
-            status = get_appointment_status(row)
-            status_emoji = get_status_emoji(status)
-            
-            result += f"{appointment_letter}. {status_emoji} Dr. {formatted_doctor}\n"
-            result += f"   📅 Date & Time: {formatted_datetime}\n"
-            result += f"   🏥 Specialization: {formatted_spec}\n"
-            result += f"   📊 Status: {status}\n\n"
-            
-            # Count by status
-            if status == "UPCOMING":
-                upcoming_count += 1
-            elif status == "COMPLETED":
-                completed_count += 1
-            elif status == "CANCELLED":
-                cancelled_count += 1
-        
-        # Add summary
-        result += f"📊 Summary:\n"
-        result += f"   🟢 Upcoming: {upcoming_count}\n"
-        result += f"   ✅ Completed: {completed_count}\n"
-        result += f"   ❌ Cancelled: {cancelled_count}\n"
-        
-        return result
-        
+            status_emoji = _STATUS_EMOJI.get(status, "📋")
+
+            parts.append(f"{appointment_letter}. {status_emoji} Dr. {_format_display_name(doctor)}\n")
+            parts.append(f"   📅 Date & Time: {date_time}\n")
+            parts.append(f"   🏥 Specialization: {_format_display_name(spec)}\n")
+            parts.append(f"   📊 Status: {status}\n\n")
+
+        # Summary counts in one C-level pass over the status vector
+        # instead of per-row if/elif branches
+        counts = pd.Series(statuses).value_counts()
+        parts.append(f"📊 Summary:\n")
+        parts.append(f"   🟢 Upcoming: {counts.get('UPCOMING', 0)}\n")
+        parts.append(f"   ✅ Completed: {counts.get('COMPLETED', 0)}\n")
+        parts.append(f"   ❌ Cancelled: {counts.get('CANCELLED', 0)}\n")
+
+        return ''.join(parts)
+
     except Exception as e:
         return f"Error getting appointments: {str(e)}"
@@ -1,5 +1,8 @@
+import asyncio
+import functools
 import os
 import logging
+import time
 from dotenv import load_dotenv
 from langchain_anthropic import ChatAnthropic
 
@@ -21,6 +24,19 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 class LLMModel:
+    # Chat clients keyed by (provider, model): the constructors open HTTP
+    # sessions and read config, so instances are shared across every
+    # LLMModel built in the process
+    _client_cache = {}
+
+    @classmethod
+    def _cached_client(cls, key, factory):
+        client = cls._client_cache.get(key)
+        if client is None:
+            client = factory()
+            cls._client_cache[key] = client
+        return client
+
     def __init__(self, model_name="claude-3-5-sonnet-20241022"):
         if not model_name:
             raise ValueError("Model is not defined.")
@@ -36,11 +52,14 @@ class LLMModel:
             ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
             if ANTHROPIC_API_KEY:
                 os.environ["ANTHROPIC_API_KEY"] = ANTHROPIC_API_KEY
-                self.primary_model = ChatAnthropic(
-                    model=self.model_name,
-                    max_tokens=4000,
-                    temperature=0.1
-                )
+                self.primary_model = self._cached_client(
+                    ("anthropic", self.model_name),
+                    lambda: ChatAnthropic(
+                        model=self.model_name,
+                        max_tokens=4000,
+                        temperature=0.1,
+                        streaming=True
+                    ))
                 logger.info("Anthropic Claude model initialized successfully")
             else:
                 logger.warning("ANTHROPIC_API_KEY not found")
@@ -53,11 +72,13 @@ class LLMModel:
                 # Try OpenAI as fallback
                 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
                 if OPENAI_API_KEY:
-                    self.fallback_model = ChatOpenAI(
-                        model="gpt-3.5-turbo",
-                        temperature=0.1,
-                        max_tokens=4000
-                    )
+                    self.fallback_model = self._cached_client(
+                        ("openai", "gpt-3.5-turbo"),
+                        lambda: ChatOpenAI(
+                            model="gpt-3.5-turbo",
+                            temperature=0.1,
+                            max_tokens=4000
+                        ))
                     logger.info("OpenAI fallback model initialized")
             except Exception as e:
                 logger.warning(f"OpenAI fallback not available: {e}")
@@ -67,11 +88,13 @@ class LLMModel:
             try:
                 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
                 if GROQ_API_KEY:
-                    self.fallback_model = ChatGroq(
-                        model="llama3-8b-8192",
-                        temperature=0.1,
-                        max_tokens=4000
-                    )
+                    self.fallback_model = self._cached_client(
+                        ("groq", "llama3-8b-8192"),
+                        lambda: ChatGroq(
+                            model="llama3-8b-8192",
+                            temperature=0.1,
+                            max_tokens=4000
+                        ))
                     logger.info("Groq fallback model initialized")
             except Exception as e:
                 logger.warning(f"Groq fallback not available: {e}")
@@ -91,31 +114,72 @@ class LLMModel:
             raise ValueError("No models available")
     
     def get_model_with_retry(self, max_retries=3):
-        """Get model with retry logic for overload errors"""
+        """Get the best available model without probing it.
+
+        This used to invoke the model with a "Hello" prompt per attempt —
+        a paid LLM round-trip on every call path. Overload handling now
+        wraps the real invocation in invoke_with_retry instead.
+        """
+        return self.get_model()
+
+    def invoke_with_retry(self, prompt, max_retries=3):
+        """Invoke the model, backing off on overload and then falling back"""
+        model = self.get_model()
         for attempt in range(max_retries):
             try:
-                model = self.get_model()
-                # Test the model with a simple call
-                test_response = model.invoke("Hello")
-                return model
+                return model.invoke(prompt)
             except Exception as e:
                 if "overloaded" in str(e).lower() or "529" in str(e):
                     logger.warning(f"Model overloaded (attempt {attempt + 1}/{max_retries}): {e}")
                     if attempt < max_retries - 1:
-                        import time
                         time.sleep(2 ** attempt)  # Exponential backoff
                         continue
                 else:
                     logger.error(f"Model error: {e}")
                     break
-        
+
         # If all retries failed, try fallback
-        if self.fallback_model and self.primary_model:
+        if self.fallback_model and model is not self.fallback_model:
             logger.warning("Switching to fallback model after retries failed")
-            return self.fallback_model
-        
+            return self.fallback_model.invoke(prompt)
+
+        raise Exception("All models failed after retries")
+
+    async def ainvoke_with_retry(self, prompt, max_retries=3):
+        """Async twin of invoke_with_retry for non-blocking call paths"""
+        model = self.get_model()
+        for attempt in range(max_retries):
+            try:
+                return await model.ainvoke(prompt)
+            except Exception as e:
+                if "overloaded" in str(e).lower() or "529" in str(e):
+                    logger.warning(f"Model overloaded (attempt {attempt + 1}/{max_retries}): {e}")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                        continue
+                else:
+                    logger.error(f"Model error: {e}")
+                    break
+
+        # If all retries failed, try fallback
+        if self.fallback_model and model is not self.fallback_model:
+            logger.warning("Switching to fallback model after retries failed")
+            return await self.fallback_model.ainvoke(prompt)
+
         raise Exception("All models failed after retries")
 
+
+@functools.lru_cache(maxsize=None)
+def get_llm(model_name: str = "claude-3-5-sonnet-20241022") -> LLMModel:
+    """Process-wide LLMModel per model name.
+
+    Callers that re-instantiate per request (or per Streamlit rerun) get
+    the already-built wrapper and clients instead of re-running
+    _setup_models each time.
+    """
+    return LLMModel(model_name)
+
+
 if __name__ == "__main__":
     llm_instance = LLMModel()  
     llm_model = llm_instance.get_model()